@@ -0,0 +1,319 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+"""Benchmarks of the addon generation tools.
+
+Synthesize repositories with a number of addons, run the tools on them
+in subprocesses, and report wall time, CPU time, peak RSS and, with
+--strace, syscall counts. Each tool is measured on a fresh copy of the
+repository with an empty cache ("cold"), and once more after a first run
+("warm").
+
+Results can be saved as a baseline, and compared with it to catch
+regressions:
+
+    $ python benchmarks/bench_tools.py --addons 10 --addons 1000 --save-baseline
+    $ python benchmarks/bench_tools.py --addons 10 --addons 1000
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+FRAGMENT_NAMES = ("DESCRIPTION", "USAGE", "CONFIGURE", "CONTRIBUTORS", "ROADMAP")
+
+PRE_COMMIT_CONFIG = """\
+exclude: |
+  (?x)
+  # NOT INSTALLABLE ADDONS
+  # END NOT INSTALLABLE ADDONS
+  ^setup/
+"""
+
+README_MD = """\
+# Bench
+
+[//]: # (addons)
+[//]: # (end addons)
+"""
+
+# tool name -> command, run in the repository directory
+TOOLS = {
+    "gen_addon_readme": [
+        sys.executable,
+        "-m",
+        "tools.gen_addon_readme",
+        "--addons-dir=.",
+        "--repo-name=bench",
+        "--branch=16.0",
+        "--if-source-changed",
+    ],
+    "gen_addons_table": [sys.executable, "-m", "tools.gen_addons_table"],
+    "hash": [
+        sys.executable,
+        "-c",
+        "import os; from tools._hash import hash; "
+        "[hash(d, relative_to=d) for d in sorted(os.listdir('.')) "
+        "if os.path.isdir(d)]",
+    ],
+    "find_addons": [
+        sys.executable,
+        "-c",
+        "from tools.manifest import find_addons; list(find_addons('.'))",
+    ],
+    "update_pre_commit_excluded_addons": [
+        sys.executable,
+        "-m",
+        "tools.update_pre_commit_excluded_addons",
+    ],
+}
+
+
+def make_fragment(name, fmt, i):
+    if fmt == "md":
+        return f"This is the **{name}** of addon {i}.\n\n- item 1\n- item 2\n"
+    return f"This is the **{name}** of addon {i}.\n\n* item 1\n* item 2\n"
+
+
+def make_repo(repo_dir, addons, fragments, fmt, asset_size):
+    """Create a repository with synthetic addons."""
+    os.makedirs(repo_dir)
+    with open(os.path.join(repo_dir, "README.md"), "w") as f:
+        f.write(README_MD)
+    with open(os.path.join(repo_dir, ".pre-commit-config.yaml"), "w") as f:
+        f.write(PRE_COMMIT_CONFIG)
+    for i in range(addons):
+        addon_dir = os.path.join(repo_dir, f"bench_addon_{i:05d}")
+        readme_dir = os.path.join(addon_dir, "readme")
+        os.makedirs(readme_dir)
+        manifest = {
+            "name": f"Bench addon {i}",
+            "summary": f"Benchmark addon number {i}",
+            "version": "16.0.1.0.0",
+            "license": "AGPL-3",
+            "author": "Odoo Community Association (OCA)",
+            "website": "https://github.com/OCA/bench",
+            "maintainers": ["bench"],
+            "depends": ["base"],
+            "data": [f"views/view_{j}.xml" for j in range(10)],
+            "installable": i % 10 != 9,
+        }
+        with open(os.path.join(addon_dir, "__manifest__.py"), "w") as f:
+            f.write(repr(manifest))
+        for name in FRAGMENT_NAMES[:fragments]:
+            with open(os.path.join(readme_dir, f"{name}.{fmt}"), "w") as f:
+                f.write(make_fragment(name, fmt, i))
+        if asset_size:
+            images_dir = os.path.join(readme_dir, "images")
+            os.makedirs(images_dir)
+            with open(os.path.join(images_dir, "screenshot.png"), "wb") as f:
+                f.write(os.urandom(asset_size))
+
+
+def count_syscalls(cmd, cwd, env):
+    """Run cmd under strace and return its number of syscalls."""
+    with tempfile.NamedTemporaryFile("r") as out:
+        subprocess.run(
+            ["strace", "-f", "-c", "-o", out.name] + cmd,
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+        for line in out:
+            fields = line.split()
+            if fields and fields[-1] == "total":
+                # % time, seconds, usecs/call, calls, [errors], total
+                return int(fields[3])
+    return None
+
+
+def measure(cmd, cwd, env):
+    """Run cmd and return its wall time, CPU time and peak RSS."""
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            cmd, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=stderr
+        )
+        # wait4 gives the resource usage of this child only
+        _, status, rusage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+        proc.returncode = (
+            os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        )
+        if proc.returncode != 0:
+            stderr.seek(0)
+            raise click.ClickException(
+                f"{' '.join(cmd)} failed:\n{stderr.read().decode('utf-8', 'replace')}"
+            )
+    return {
+        "wall": wall,
+        "cpu": rusage.ru_utime + rusage.ru_stime,
+        # ru_maxrss is in KiB on Linux
+        "max_rss_mib": rusage.ru_maxrss / 1024,
+    }
+
+
+def run_benchmark(template_dir, work_dir, tool, warm, strace):
+    """Measure a tool on a fresh copy of the template repository."""
+    repo_dir = os.path.join(work_dir, "repo")
+    cache_dir = os.path.join(work_dir, "cache")
+    for d in (repo_dir, cache_dir):
+        shutil.rmtree(d, ignore_errors=True)
+    shutil.copytree(template_dir, repo_dir, symlinks=True)
+    env = dict(os.environ, OCA_TOOLS_CACHE_DIR=cache_dir)
+    cmd = TOOLS[tool]
+    if warm:
+        measure(cmd, repo_dir, env)
+    result = measure(cmd, repo_dir, env)
+    if strace:
+        result["syscalls"] = count_syscalls(cmd, repo_dir, env)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Return the list of regressions of results compared to baseline."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric in ("wall", "cpu", "syscalls"):
+            if result.get(metric) is None or base.get(metric) is None:
+                continue
+            if result[metric] > base[metric] * tolerance:
+                regressions.append(
+                    f"{key}: {metric} {result[metric]:.3f} > "
+                    f"{base[metric]:.3f} * {tolerance}"
+                )
+    return regressions
+
+
+def format_result(key, result):
+    syscalls = result.get("syscalls")
+    return (
+        f"{key:<75} {result['wall']:>8.3f} {result['cpu']:>8.3f} "
+        f"{result['max_rss_mib']:>8.1f} {syscalls if syscalls else '':>9}"
+    )
+
+
+@click.command(help=__doc__)
+@click.option(
+    "--addons",
+    "addons_counts",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[10, 100],
+    show_default=True,
+    help="Number of addons of the synthetic repository. May be repeated.",
+)
+@click.option("--fragments", type=click.IntRange(1, len(FRAGMENT_NAMES)), default=3)
+@click.option(
+    "--format",
+    "formats",
+    type=click.Choice(["rst", "md"]),
+    multiple=True,
+    default=["rst"],
+    help="Format of readme fragments. May be repeated.",
+)
+@click.option(
+    "--asset-size",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Size in bytes of an image added to the readme directory of each addon.",
+)
+@click.option(
+    "--tool",
+    "tools",
+    type=click.Choice(sorted(TOOLS)),
+    multiple=True,
+    help="Tool to benchmark. May be repeated. Default: all.",
+)
+@click.option("--strace/--no-strace", help="Count syscalls with strace.")
+@click.option(
+    "--baseline",
+    "baseline_path",
+    default=DEFAULT_BASELINE,
+    type=click.Path(dir_okay=False),
+    show_default=True,
+)
+@click.option("--save-baseline", is_flag=True, help="Save the results as baseline.")
+@click.option(
+    "--tolerance",
+    type=float,
+    default=1.5,
+    show_default=True,
+    help="Report a regression when a result exceeds the baseline by this factor.",
+)
+@click.option(
+    "--json-output", type=click.Path(dir_okay=False), help="Write results as JSON."
+)
+def main(
+    addons_counts,
+    fragments,
+    formats,
+    asset_size,
+    tools,
+    strace,
+    baseline_path,
+    save_baseline,
+    tolerance,
+    json_output,
+):
+    if strace and not shutil.which("strace"):
+        raise click.ClickException("strace not found")
+    if "md" in formats and not shutil.which("pandoc"):
+        raise click.ClickException("pandoc is required for markdown fragments")
+    tools = tools or sorted(TOOLS)
+    results = {}
+    click.echo(
+        f"{'benchmark':<75} {'wall s':>8} {'cpu s':>8} {'rss MiB':>8} {'syscalls':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for addons in addons_counts:
+            for fmt in formats:
+                template_dir = os.path.join(tmp_dir, f"template-{addons}-{fmt}")
+                make_repo(template_dir, addons, fragments, fmt, asset_size)
+                for tool in tools:
+                    for warm in (False, True):
+                        key = (
+                            f"{tool}/{'warm' if warm else 'cold'}/addons={addons}/"
+                            f"{fmt}/fragments={fragments}/asset={asset_size}"
+                        )
+                        results[key] = run_benchmark(
+                            template_dir, tmp_dir, tool, warm, strace
+                        )
+                        click.echo(format_result(key, results[key]))
+                shutil.rmtree(template_dir)
+    if json_output:
+        with open(json_output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if save_baseline:
+        baseline = {}
+        if os.path.exists(baseline_path):
+            with open(baseline_path) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(baseline_path, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        click.echo(f"Baseline saved to {baseline_path}")
+    elif os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), tolerance)
+        if regressions:
+            raise click.ClickException(
+                "Regressions compared to baseline:\n" + "\n".join(regressions)
+            )
+        click.echo("No regression compared to baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import pytest
+
+from tools._cache import CACHE_DIR_ENV
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path_factory, monkeypatch):
+    """Isolate the on-disk caches of the tools, in this process and subprocesses."""
+    cache_dir = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv(CACHE_DIR_ENV, str(cache_dir))
+    yield cache_dir
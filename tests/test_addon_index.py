@@ -0,0 +1,61 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+
+import os
+
+from tools import addon_index
+from tools.manifest import manifest_counters
+
+
+def _write_manifest(addon_dir, manifest, mtime=1_000_000_000):
+    addon_dir.mkdir(exist_ok=True)
+    manifest_path = addon_dir / "__manifest__.py"
+    manifest_path.write_text(repr(manifest))
+    # old enough for the stat data to be trusted
+    os.utime(manifest_path, (mtime, mtime))
+
+
+def test_addon_index(tmp_path):
+    _write_manifest(tmp_path / "addon1", {"name": "A1", "version": "1.0", "data": []})
+    _write_manifest(tmp_path / "addon2", {"name": "A2", "installable": False})
+    (tmp_path / "not_an_addon").mkdir()
+
+    def parsed():
+        return manifest_counters["parsed"] - parsed_before
+
+    parsed_before = manifest_counters["parsed"]
+    index = addon_index.get_addon_index(str(tmp_path))
+    assert sorted(index) == ["addon1", "addon2"]
+    assert index["addon1"]["manifest"] == {"name": "A1", "version": "1.0"}
+    assert index["addon1"]["digest"].startswith("sha256:")
+    assert parsed() == 2
+    # unchanged manifests are not parsed again
+    parsed_before = manifest_counters["parsed"]
+    assert addon_index.get_addon_index(str(tmp_path)) == index
+    assert parsed() == 0
+    # only the modified manifest is parsed again
+    _write_manifest(tmp_path / "addon1", {"name": "A1", "version": "1.1"}, 2 * 10**9)
+    index = addon_index.get_addon_index(str(tmp_path))
+    assert parsed() == 1
+    assert index["addon1"]["manifest"]["version"] == "1.1"
+    addons = list(addon_index.find_indexed_addons(str(tmp_path)))
+    assert addons == [
+        ("addon1", os.path.join(str(tmp_path), "addon1"), index["addon1"]["manifest"])
+    ]
+
+
+def test_addon_index_racy(tmp_path, monkeypatch):
+    addon_dir = tmp_path / "addon1"
+    addon_dir.mkdir()
+    (addon_dir / "__manifest__.py").write_text(repr({"name": "A1"}))
+    index = addon_index.get_addon_index(str(tmp_path))
+    # the manifest has just been written, its stat data is not trusted
+    assert index["addon1"]["stat"] is None
+
+
+def test_addon_index_cache_unusable(tmp_path, monkeypatch):
+    not_a_dir = tmp_path / "not-a-dir"
+    not_a_dir.write_text("")
+    monkeypatch.setenv("OCA_TOOLS_CACHE_DIR", str(not_a_dir))
+    _write_manifest(tmp_path / "addon1", {"name": "A1"})
+    index = addon_index.get_addon_index(str(tmp_path))
+    assert index["addon1"]["manifest"] == {"name": "A1"}
@@ -0,0 +1,35 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+
+import json
+import os
+import subprocess
+import sys
+
+BENCH_TOOLS = os.path.join(
+    os.path.dirname(__file__), "..", "benchmarks", "bench_tools.py"
+)
+
+
+def test_bench_tools(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    cmd = [
+        sys.executable,
+        BENCH_TOOLS,
+        "--addons=2",
+        "--tool=find_addons",
+        "--tool=gen_addons_table",
+        f"--baseline={baseline}",
+    ]
+    subprocess.check_call(cmd + ["--save-baseline"])
+    results = json.loads(baseline.read_text())
+    assert set(results) == {
+        f"{tool}/{state}/addons=2/rst/fragments=3/asset=0"
+        for tool in ("find_addons", "gen_addons_table")
+        for state in ("cold", "warm")
+    }
+    assert all(r["wall"] > 0 and r["max_rss_mib"] > 0 for r in results.values())
+    # make the baseline impossibly fast to trigger a regression
+    for result in results.values():
+        result["wall"] = result["cpu"] = 1e-6
+    baseline.write_text(json.dumps(results))
+    assert subprocess.call(cmd) == 1
@@ -0,0 +1,37 @@
+import os
+
+from tools._cache import FileCache, get_cache_dir, make_key
+
+
+def test_get_cache_dir(cache_dir):
+    d = get_cache_dir("a", "b")
+    assert d == str(cache_dir / "a" / "b")
+    assert os.path.isdir(d)
+
+
+def test_make_key():
+    assert make_key("a", b"b") == make_key(b"a", "b")
+    assert make_key("ab", "c") != make_key("a", "bc")
+
+
+def test_file_cache(tmp_path):
+    cache = FileCache(str(tmp_path), max_size=100)
+    assert cache.get("k1") is None
+    cache.set("k1", b"v1")
+    assert cache.get("k1") == b"v1"
+    # a new instance sees the same entries
+    assert FileCache(str(tmp_path), max_size=100).get("k1") == b"v1"
+
+
+def test_file_cache_eviction(tmp_path):
+    cache = FileCache(str(tmp_path), max_size=25)
+    cache.set("k1", b"1" * 10)
+    cache.set("k2", b"2" * 10)
+    os.utime(tmp_path / "k1", ns=(1, 1))
+    os.utime(tmp_path / "k2", ns=(2, 2))
+    # use k1, so k2 becomes the least recently used entry
+    assert cache.get("k1")
+    cache.set("k3", b"3" * 10)
+    assert cache.get("k1")
+    assert cache.get("k2") is None
+    assert cache.get("k3")
@@ -0,0 +1,149 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+
+import json
+import subprocess
+import threading
+import time
+
+import pytest
+
+from tools import clone_everything, oca_projects
+
+from .utils import dir_changer
+
+PROJECTS = ["project-a", "project-b", "project-c"]
+
+
+@pytest.fixture
+def remotes(tmp_path, monkeypatch):
+    """Local repositories standing in for the OCA repositories."""
+    remotes_dir = tmp_path / "remotes"
+    for project in PROJECTS:
+        repo_dir = remotes_dir / project
+        subprocess.check_call(["git", "init", "--quiet", str(repo_dir)])
+        (repo_dir / "README").write_text(project)
+        subprocess.check_call(["git", "add", "README"], cwd=repo_dir)
+        subprocess.check_call(
+            [
+                "git",
+                "-c",
+                "user.name=test",
+                "-c",
+                "user.email=test@example.com",
+                "commit",
+                "--quiet",
+                "-m",
+                "init",
+            ],
+            cwd=repo_dir,
+        )
+
+    def url(project, protocol="git", org_name="OCA"):
+        return str(remotes_dir / project)
+
+    monkeypatch.setattr(clone_everything, "url", url)
+    monkeypatch.setattr(oca_projects, "url", url)
+    monkeypatch.setattr(
+        clone_everything,
+        "get_repository_names",
+        lambda refresh=False: PROJECTS,
+    )
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    with dir_changer(work_dir):
+        yield work_dir
+
+
+def test_clone_parallel(remotes):
+    clone_everything.clone(jobs=2)
+    for project in PROJECTS:
+        assert (remotes / project / "README").read_text() == project
+    assert not (remotes / clone_everything.STATE_FILENAME).exists()
+    # a second run fetches the existing clones
+    clone_everything.clone(jobs=2)
+    assert not (remotes / clone_everything.STATE_FILENAME).exists()
+
+
+def test_clone_resume(remotes, capsys):
+    state_path = remotes / clone_everything.STATE_FILENAME
+    state_path.write_text(json.dumps({"done": ["project-b"]}))
+    clone_everything.clone()
+    assert "Resuming, 1 repositories already done" in capsys.readouterr().out
+    assert (remotes / "project-a").is_dir()
+    assert not (remotes / "project-b").exists()
+    assert (remotes / "project-c").is_dir()
+    assert not state_path.exists()
+
+
+def test_clone_restart(remotes):
+    state_path = remotes / clone_everything.STATE_FILENAME
+    state_path.write_text(json.dumps({"done": ["project-b"]}))
+    clone_everything.clone(restart=True)
+    assert (remotes / "project-b").is_dir()
+    assert not state_path.exists()
+
+
+def test_clone_reference(remotes, cache_dir):
+    # an existing clone gets the cache as alternate too
+    subprocess.check_call(
+        ["git", "clone", "--quiet", clone_everything.url("project-a"), "project-a"]
+    )
+    clone_everything.clone(reference=True)
+    for project in PROJECTS:
+        repo_cache_dir = cache_dir / "github.com" / "oca" / project
+        assert subprocess.check_output(["git", "branch"], cwd=repo_cache_dir)
+        alternates = remotes / project / ".git" / "objects" / "info" / "alternates"
+        assert alternates.read_text() == str(repo_cache_dir / "objects") + "\n"
+        assert (remotes / project / "README").read_text() == project
+    # the cache is not added twice
+    clone_everything.clone(reference=True)
+    alternates = remotes / "project-a" / ".git" / "objects" / "info" / "alternates"
+    assert len(alternates.read_text().splitlines()) == 1
+
+
+def test_clone_failure_does_not_resume(remotes, monkeypatch):
+    monkeypatch.setattr(
+        clone_everything,
+        "get_repository_names",
+        lambda refresh=False: PROJECTS + ["missing"],
+    )
+    clone_everything.clone()
+    assert not (remotes / "missing").exists()
+    # the next run processes all repositories again
+    assert not (remotes / clone_everything.STATE_FILENAME).exists()
+
+
+def test_clone_interrupted(tmp_path, monkeypatch):
+    projects = ["p1", "p2", "p3", "p4"]
+    monkeypatch.setattr(
+        clone_everything, "get_repository_names", lambda refresh=False: projects
+    )
+    started = []
+    interrupted = threading.Event()
+
+    def clone_one(project, *args):
+        if project != "p1":
+            started.append(project)
+            interrupted.wait(5)
+            # still running when the pending clones are cancelled
+            time.sleep(0.2)
+        return True
+
+    add = clone_everything.CloneState.add
+
+    def add_then_interrupt(self, project):
+        add(self, project)
+        if project == "p1":
+            # wait for both workers to be busy
+            while len(started) < 2:
+                time.sleep(0.01)
+            interrupted.set()
+            raise KeyboardInterrupt()
+
+    monkeypatch.setattr(clone_everything, "clone_one", clone_one)
+    monkeypatch.setattr(clone_everything.CloneState, "add", add_then_interrupt)
+    with dir_changer(tmp_path), pytest.raises(KeyboardInterrupt):
+        clone_everything.clone(jobs=2)
+    assert sorted(started) == ["p2", "p3"]
+    state_path = tmp_path / clone_everything.STATE_FILENAME
+    assert json.loads(state_path.read_text()) == {"done": ["p1", "p2", "p3"]}
@@ -1,18 +1,27 @@
 # License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
 # Copyright (c) 2018 ACSONE SA/NV
 
+import json
 import os
 import shutil
 import subprocess
 import sys
 from pathlib import Path
 
+import pypandoc
 import pytest
+from click.testing import CliRunner
 
+from tools import _hash, gen_addon_readme
 from tools.gen_addon_readme import (
+    PANDOC_MARKDOWN_FORMAT,
     _get_source_digest,
     get_fragment_format,
     get_fragments_format,
+    get_template,
+    markdown_to_rst,
+    pandoc_convert_batch,
+    rst_to_html,
     safe_remove,
 )
 
@@ -52,6 +61,129 @@ def test_gen_addon_readme_oca(addons_dir):
     _assert_expected(addons_dir, "oca")
 
 
+def test_gen_addon_readme_jobs(addons_dir):
+    cmd = [
+        sys.executable,
+        "-m",
+        "tools.gen_addon_readme",
+        "--addons-dir",
+        ".",
+        "--repo-name",
+        "server-tools",
+        "--branch",
+        "12.0",
+        "--jobs",
+        "2",
+    ]
+    subprocess.check_call(cmd, cwd=str(addons_dir))
+    _assert_expected(addons_dir, "oca")
+
+
+def test_gen_addon_readme_cache_unusable(addons_dir, tmp_path):
+    """The caches are only a speed-up, an unusable one is not an error"""
+    not_a_dir = tmp_path / "not-a-dir"
+    not_a_dir.write_text("")
+    cmd = [
+        sys.executable,
+        "-m",
+        "tools.gen_addon_readme",
+        "--addons-dir",
+        ".",
+        "--repo-name",
+        "server-tools",
+        "--branch",
+        "12.0",
+    ]
+    env = dict(os.environ, OCA_TOOLS_CACHE_DIR=str(not_a_dir))
+    subprocess.check_call(cmd, cwd=str(addons_dir), env=env)
+    _assert_expected(addons_dir, "oca")
+
+
+def test_gen_addon_readme_profile(addons_dir, tmp_path):
+    profile_json = tmp_path / "profile.json"
+    cmd = [
+        sys.executable,
+        "-m",
+        "tools.gen_addon_readme",
+        "--addons-dir",
+        ".",
+        "--repo-name",
+        "server-tools",
+        "--branch",
+        "12.0",
+        "--jobs",
+        "2",
+        "--profile-json",
+        str(profile_json),
+    ]
+    # --profile-json enables profiling
+    res = subprocess.run(cmd, cwd=addons_dir, stderr=subprocess.PIPE)
+    assert res.returncode == 0
+    assert b"rst_to_html" in res.stderr
+    data = json.loads(profile_json.read_text())
+    # phases of workers are recorded per addon
+    assert set(data["timings"]["addon1"]) >= {"fragments", "template", "rst_to_html"}
+    assert "hash" in data["timings"][""]
+    assert data["counters"]["docutils_parses"] >= 2
+    assert data["counters"]["bytes_hashed"] > 0
+    assert data["counters"]["files_written"] > 0
+
+
+def test_gen_addon_readme_jobs_rst_error(addons_dir):
+    with open(os.path.join(addons_dir, "addon1", "readme", "USAGE.rst"), "w") as f:
+        f.write("Usage\n-----\n\nblah.\n")
+    cmd = [
+        sys.executable,
+        "-m",
+        "tools.gen_addon_readme",
+        "--addons-dir",
+        ".",
+        "--repo-name",
+        "server-tools",
+        "--branch",
+        "12.0",
+        "--jobs",
+        "2",
+    ]
+    with pytest.raises(subprocess.CalledProcessError) as e:
+        subprocess.check_output(
+            cmd, cwd=str(addons_dir), stderr=subprocess.STDOUT, text=True
+        )
+    assert (
+        "Inconsistent title style" in e.value.output
+        or "Title level inconsistent" in e.value.output
+    )
+
+
+def test_gen_addon_readme_jobs_stops_at_error(addons_dir):
+    with open(os.path.join(addons_dir, "addon1", "readme", "USAGE.rst"), "w") as f:
+        f.write("Usage\n-----\n\nblah.\n")
+    copies = [os.path.join(addons_dir, f"addon_zz_{i:02d}") for i in range(40)]
+    for copy in copies:
+        shutil.copytree(os.path.join(addons_dir, "addon_one_maintainer"), copy)
+    cmd = [
+        sys.executable,
+        "-m",
+        "tools.gen_addon_readme",
+        "--repo-name",
+        "server-tools",
+        "--branch",
+        "12.0",
+        "--jobs",
+        "2",
+        # the failing addon first
+        "--addon-dir",
+        "addon1",
+    ]
+    for copy in copies:
+        cmd += ["--addon-dir", copy]
+    res = subprocess.run(cmd, cwd=str(addons_dir), stderr=subprocess.DEVNULL)
+    assert res.returncode != 0
+    # the addons queued after the failing one are not generated
+    generated = [c for c in copies if os.path.exists(os.path.join(c, "README.rst"))]
+    assert len(generated) < len(copies) / 2
+
+
 def test_gen_addon_readme_if_fragments_changed(addons_dir):
     cmd = [
         sys.executable,
@@ -83,6 +215,92 @@ def test_gen_addon_readme_if_fragments_changed(addons_dir):
         assert not readme_file.read().endswith("trailer")
 
 
+def test_gen_addon_readme_unchanged_not_written(addons_dir):
+    cmd = [
+        sys.executable,
+        "-m",
+        "tools.gen_addon_readme",
+        "--addon-dir",
+        "addon1",
+        "--repo-name",
+        "server-tools",
+        "--branch",
+        "12.0",
+    ]
+    readme_path = Path(addons_dir, "addon1", "README.rst")
+    index_path = Path(addons_dir, "addon1", "static", "description", "index.html")
+    subprocess.check_call(cmd, cwd=str(addons_dir))
+    os.utime(readme_path, ns=(0, 0))
+    os.utime(index_path, ns=(0, 0))
+    subprocess.check_call(cmd, cwd=str(addons_dir))
+    assert readme_path.stat().st_mtime_ns == 0
+    assert index_path.stat().st_mtime_ns == 0
+    # change something and check both files are written
+    with Path(addons_dir, "addon1", "readme", "DESCRIPTION.rst").open("a") as f:
+        f.write("* CHUNK\n")
+    subprocess.check_call(cmd, cwd=str(addons_dir))
+    assert readme_path.stat().st_mtime_ns != 0
+    assert index_path.stat().st_mtime_ns != 0
+
+
+def _set_old_mtimes(path):
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            os.utime(os.path.join(dirpath, filename), ns=(10**18, 10**18))
+
+
+def test_gen_addon_readme_if_source_changed_fast_path(addons_dir, monkeypatch):
+    addon_dir = os.path.join(addons_dir, "addon1")
+    args = [
+        "--addon-dir",
+        addon_dir,
+        "--repo-name",
+        "server-tools",
+        "--branch",
+        "12.0",
+        "--if-source-changed",
+    ]
+    calls = []
+
+    def spy(func):
+        def wrapper(*args, **kwargs):
+            calls.append(func.__name__)
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(_hash, "hash", spy(_hash.hash))
+    monkeypatch.setattr(
+        gen_addon_readme,
+        "_source_digest_match",
+        spy(gen_addon_readme._source_digest_match),
+    )
+    _set_old_mtimes(addon_dir)
+    result = CliRunner().invoke(gen_addon_readme.gen_addon_readme, args)
+    assert result.exit_code == 0, result.output
+    assert calls == ["hash", "_source_digest_match"]
+    # README.rst has just been written, so it has to be read once more
+    _set_old_mtimes(addon_dir)
+    calls.clear()
+    CliRunner().invoke(gen_addon_readme.gen_addon_readme, args)
+    assert calls == ["_source_digest_match"]
+    # nothing changed, no file is read
+    calls.clear()
+    CliRunner().invoke(gen_addon_readme.gen_addon_readme, args)
+    assert calls == []
+    # change a fragment, keeping its size
+    description_path = os.path.join(addon_dir, "readme", "DESCRIPTION.rst")
+    with open(description_path) as f:
+        description = f.read()
+    with open(description_path, "w") as f:
+        f.write(description.replace("blah", "halb"))
+    calls.clear()
+    CliRunner().invoke(gen_addon_readme.gen_addon_readme, args)
+    assert calls == ["hash", "_source_digest_match"]
+    with open(os.path.join(addon_dir, "README.rst")) as f:
+        assert "halb" in f.read()
+
+
 def test_gen_addon_readme_keep_source_digest(addons_dir):
     cmd = [
         sys.executable,
@@ -212,3 +430,122 @@ def test_get_source_digest(tmp_path):
     assert _get_source_digest(str(readme_path)) is None
     readme_path.write_text("!! source digest: ")
     assert _get_source_digest(str(readme_path)) is None
+
+
+def test_rst_to_html():
+    html = rst_to_html("Title\n=====\n\nSome text.\n")
+    assert b"<p>Some text.</p>" in html
+    assert b'name="generator" content="Docutils: ' in html
+    with pytest.raises(Exception) as e:
+        rst_to_html("Title\n=====\n\n.. notadirective::\n")
+    assert 'Unknown directive type "notadirective"' in str(e.value)
+
+
+def test_markdown_to_rst_cache(monkeypatch):
+    calls = []
+
+    def convert_text(source, format, to, extra_args, sandbox):
+        calls.append((source, extra_args))
+        return "rst " + source
+
+    monkeypatch.setattr(gen_addon_readme, "ensure_pandoc_installed", lambda: None)
+    monkeypatch.setattr(pypandoc, "get_pandoc_version", lambda: "3")
+    monkeypatch.setattr(pypandoc, "convert_text", convert_text)
+    assert markdown_to_rst(b"md", 0) == "rst md"
+    assert markdown_to_rst(b"md", 0) == "rst md"
+    assert calls == [("md", ["--shift-heading-level-by=0"])]
+    # the heading shift level is part of the cache key
+    assert markdown_to_rst(b"md", 1) == "rst md"
+    assert len(calls) == 2
+    # so is the pandoc version
+    monkeypatch.setattr(pypandoc, "get_pandoc_version", lambda: "4")
+    assert markdown_to_rst(b"md", 1) == "rst md"
+    assert len(calls) == 3
+
+
+def test_markdown_to_rst_cache_unusable(monkeypatch, tmp_path):
+    calls = []
+
+    def convert_text(source, format, to, extra_args, sandbox):
+        calls.append(source)
+        return "rst " + source
+
+    not_a_dir = tmp_path / "not-a-dir"
+    not_a_dir.write_text("")
+    monkeypatch.setenv("OCA_TOOLS_CACHE_DIR", str(not_a_dir))
+    monkeypatch.setattr(gen_addon_readme, "ensure_pandoc_installed", lambda: None)
+    monkeypatch.setattr(pypandoc, "get_pandoc_version", lambda: "3")
+    monkeypatch.setattr(pypandoc, "convert_text", convert_text)
+    assert markdown_to_rst(b"md", 0) == "rst md"
+    assert markdown_to_rst(b"md", 0) == "rst md"
+    assert calls == ["md", "md"]
+
+
+def _pandoc_available():
+    try:
+        pypandoc.get_pandoc_version()
+    except OSError:
+        return False
+    return True
+
+
+@pytest.mark.skipif(not _pandoc_available(), reason="pandoc not installed")
+def test_pandoc_convert_batch():
+    fragments = [
+        ("# Title\n\n## Sub\n\nSome *text*.\n", PANDOC_MARKDOWN_FORMAT, "rst", 0),
+        ("# Title\n\n## Sub\n\nSome *text*.\n", PANDOC_MARKDOWN_FORMAT, "rst", 1),
+        ("", PANDOC_MARKDOWN_FORMAT, "rst", 0),
+        (
+            "![image](../static/img.png)\n\n\tcode\ttab\n",
+            PANDOC_MARKDOWN_FORMAT,
+            "rst",
+            0,
+        ),
+        ("Title\n~~~~~\n\n* item\n", "rst", PANDOC_MARKDOWN_FORMAT, 1),
+    ]
+    expected = [
+        pypandoc.convert_text(
+            text,
+            format=from_format,
+            to=to_format,
+            extra_args=[f"--shift-heading-level-by={shift}"],
+            sandbox=True,
+        )
+        for text, from_format, to_format, shift in fragments
+    ]
+    assert pandoc_convert_batch(fragments) == expected
+
+
+def test_get_template(tmp_path, cache_dir):
+    template_path = tmp_path / "template.rst.jinja"
+    template_path.write_text("Hello {{ name }}!")
+    template = get_template(str(template_path))
+    assert get_template(str(template_path)) is template
+    assert template.render(name="world") == "Hello world!"
+    assert list((cache_dir / "jinja-bytecode").iterdir())
+
+
+def test_get_template_cache_unusable(tmp_path, monkeypatch):
+    not_a_dir = tmp_path / "not-a-dir"
+    not_a_dir.write_text("")
+    monkeypatch.setenv("OCA_TOOLS_CACHE_DIR", str(not_a_dir))
+    template_path = tmp_path / "template.rst.jinja"
+    template_path.write_text("Hello {{ name }}!")
+    assert get_template(str(template_path)).render(name="world") == "Hello world!"
+
+
+def test_gen_addon_readme_hash_workers(addons_dir, monkeypatch):
+    pool_sizes = []
+
+    def hash_many(jobs, max_workers=None):
+        pool_sizes.append(max_workers)
+        return _hash.hash_many(jobs, max_workers)
+
+    monkeypatch.setattr(gen_addon_readme, "hash_many", hash_many)
+    args = ["--addons-dir", addons_dir, "--repo-name", "server-tools"]
+    result = CliRunner().invoke(
+        gen_addon_readme.gen_addon_readme, args + ["--branch", "12.0"]
+    )
+    assert result.exit_code == 0, result.output
+    # the default thread pool size, not the single --jobs process
+    assert pool_sizes == [None]
@@ -42,3 +42,94 @@ def test_absent_readme(tmp_path):
         [sys.executable, "-m", "tools.gen_addons_table"], cwd=str(tmp_path)
     )
     assert res == 0
+
+
+def test_terp_manifest(tmp_path):
+    """gen_addons_table must find addons with a __terp__.py manifest"""
+    addon_dir = tmp_path / "addon1"
+    addon_dir.mkdir()
+    (addon_dir / "__terp__.py").write_text(
+        "{'name': 'Addon 1', 'version': '5.0.1', 'installable': True}"
+    )
+    readme = tmp_path / "README.md"
+    readme.write_text("[//]: # (addons)\n[//]: # (end addons)\n")
+    res = subprocess.call(
+        [sys.executable, "-m", "tools.gen_addons_table"], cwd=str(tmp_path)
+    )
+    assert res == 0
+    assert "[addon1](addon1/) | 5.0.1 |  | Addon 1" in readme.read_text()
+
+
+def test_unchanged_table(tmp_path):
+    """README.md is not rewritten when the addons did not change"""
+    addon_dir = tmp_path / "addon1"
+    addon_dir.mkdir()
+    manifest_path = addon_dir / "__manifest__.py"
+    manifest_path.write_text("{'name': 'Addon 1', 'version': '16.0.1.0.0'}")
+    readme = tmp_path / "README.md"
+    readme.write_text("[//]: # (addons)\n[//]: # (end addons)\n")
+    cmd = [sys.executable, "-m", "tools.gen_addons_table"]
+    assert subprocess.call(cmd, cwd=str(tmp_path)) == 0
+    content = readme.read_text()
+    assert "[//]: # (addons digest sha256:" in content
+    os.utime(readme, (0, 0))
+    assert subprocess.call(cmd, cwd=str(tmp_path)) == 0
+    assert readme.stat().st_mtime == 0
+    # a change to a summary updates the table and its digest
+    manifest_path.write_text(
+        "{'name': 'Addon 1', 'version': '16.0.1.0.0', 'summary': 'New'}"
+    )
+    assert subprocess.call(cmd, cwd=str(tmp_path)) == 0
+    new_content = readme.read_text()
+    assert "| New" in new_content
+    assert new_content.splitlines()[1] != content.splitlines()[1]
+
+
+def test_commit_up_to_date_table(tmp_path):
+    """--commit must commit a table generated by an earlier run"""
+    git_env = dict(
+        os.environ,
+        GIT_AUTHOR_NAME="test",
+        GIT_AUTHOR_EMAIL="test@example.com",
+        GIT_COMMITTER_NAME="test",
+        GIT_COMMITTER_EMAIL="test@example.com",
+    )
+    addon_dir = tmp_path / "addon1"
+    addon_dir.mkdir()
+    (addon_dir / "__manifest__.py").write_text(
+        "{'name': 'Addon 1', 'version': '16.0.1.0.0'}"
+    )
+    readme = tmp_path / "README.md"
+    readme.write_text("[//]: # (addons)\n[//]: # (end addons)\n")
+    subprocess.check_call(["git", "init", "--quiet"], cwd=str(tmp_path))
+    subprocess.check_call(["git", "add", "README.md"], cwd=str(tmp_path))
+    subprocess.check_call(
+        ["git", "commit", "--quiet", "-m", "init"], cwd=str(tmp_path), env=git_env
+    )
+    cmd = [sys.executable, "-m", "tools.gen_addons_table"]
+    subprocess.check_call(cmd, cwd=str(tmp_path))
+    subprocess.check_call(cmd + ["--commit"], cwd=str(tmp_path), env=git_env)
+    status = subprocess.check_output(
+        ["git", "status", "--porcelain", "README.md"], cwd=str(tmp_path)
+    )
+    assert not status
+    log = subprocess.check_output(
+        ["git", "log", "--format=%s"], cwd=str(tmp_path), universal_newlines=True
+    )
+    assert log.splitlines()[0] == "[UPD] addons table in README.md"
+
+
+def test_cache_unusable(tmp_path):
+    """gen_addons_table must work without a usable cache"""
+    not_a_dir = tmp_path / "not-a-dir"
+    not_a_dir.write_text("")
+    addon_dir = tmp_path / "addon1"
+    addon_dir.mkdir()
+    (addon_dir / "__manifest__.py").write_text("{'name': 'Addon 1'}")
+    readme = tmp_path / "README.md"
+    readme.write_text("[//]: # (addons)\n[//]: # (end addons)\n")
+    env = dict(os.environ, OCA_TOOLS_CACHE_DIR=str(not_a_dir))
+    subprocess.check_call(
+        [sys.executable, "-m", "tools.gen_addons_table"], cwd=str(tmp_path), env=env
+    )
+    assert "[addon1](addon1/)" in readme.read_text()
@@ -0,0 +1,151 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+"""Tests of the GitHub API client, against a local stand-in for GitHub."""
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from tools import oca_projects
+from tools._github_api import GitHubAPI
+
+REPOSITORIES = {
+    "web": ["16.0", "17.0"],
+    "server-tools": ["16.0"],
+    "maintainer-tools": ["master"],
+    # more branches than fit in a page
+    "many-branches": [f"b{i:03d}" for i in range(150)],
+}
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, data, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_page(self, items):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        per_page = int(query["per_page"][0])
+        page = int(query.get("page", ["1"])[0])
+        headers = {}
+        if page * per_page < len(items):
+            next_url = (
+                f"http://{self.headers['Host']}{url.path}"
+                f"?per_page={per_page}&page={page + 1}"
+            )
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        self._send_json(items[(page - 1) * per_page : page * per_page], headers)
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.server.rate_limited:
+            # answer the first request with a secondary rate limit error
+            self.server.rate_limited = False
+            self.send_response(403)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        path = urlparse(self.path).path
+        if path == "/orgs/OCA/repos":
+            self._send_page([{"name": name} for name in REPOSITORIES])
+            return
+        mo = re.match(r"^/repos/OCA/([^/]+)/branches$", path)
+        if mo:
+            self._send_page([{"name": name} for name in REPOSITORIES[mo.group(1)]])
+            return
+        self.send_error(404)
+
+    def do_POST(self):
+        self.server.requests.append(self.path)
+        length = int(self.headers["Content-Length"])
+        variables = json.loads(self.rfile.read(length))["variables"]
+        # one repository per page
+        names = list(REPOSITORIES)
+        index = int(variables["cursor"] or 0)
+        branches = REPOSITORIES[names[index]]
+        self._send_json(
+            {
+                "data": {
+                    "organization": {
+                        "repositories": {
+                            "pageInfo": {
+                                "hasNextPage": index + 1 < len(names),
+                                "endCursor": str(index + 1),
+                            },
+                            "nodes": [
+                                {
+                                    "name": names[index],
+                                    "refs": {
+                                        "pageInfo": {
+                                            "hasNextPage": len(branches) > 100
+                                        },
+                                        "nodes": [{"name": b} for b in branches[:100]],
+                                    },
+                                }
+                            ],
+                        }
+                    }
+                }
+            }
+        )
+
+
+@pytest.fixture
+def fake_github():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHubHandler)
+    server.requests = []
+    server.rate_limited = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_repositories_and_branches(fake_github):
+    api = GitHubAPI("token", fake_github.url)
+    assert api.get_repositories_and_branches("OCA", max_workers=4) == REPOSITORIES
+
+
+def test_get_repositories_and_branches_graphql(fake_github):
+    api = GitHubAPI("token", fake_github.url)
+    assert api.get_repositories_and_branches_graphql("OCA") == REPOSITORIES
+    assert fake_github.requests.count("/graphql") == len(REPOSITORIES)
+
+
+def test_rate_limit(fake_github):
+    api = GitHubAPI("token", fake_github.url)
+    delays = []
+    api._sleep = delays.append
+    fake_github.rate_limited = True
+    assert api.get_branch_names("OCA", "web") == ["16.0", "17.0"]
+    # the rate limited request has been retried
+    assert len(fake_github.requests) == 2
+
+
+def test_get_repositories_and_branches_snapshot(fake_github, monkeypatch):
+    monkeypatch.setattr(oca_projects, "get_token", lambda: "token")
+    monkeypatch.setattr(oca_projects, "_branches_snapshots", {})
+    monkeypatch.setenv("GITHUB_API_URL", fake_github.url)
+    result = list(oca_projects.get_repositories_and_branches())
+    assert result == [("web", "16.0"), ("web", "17.0"), ("server-tools", "16.0")]
+    requests_count = len(fake_github.requests)
+    # the snapshot is reused by subsequent calls
+    result = list(oca_projects.get_repositories_and_branches(repos=["web"]))
+    assert result == [("web", "16.0"), ("web", "17.0")]
+    assert len(fake_github.requests) == requests_count
@@ -1,6 +1,19 @@
+import hashlib
+import os
+
 import pytest
 
-from tools._hash import _walk, hash
+from tools import _hash
+from tools._hash import (
+    _walk,
+    diff_trees,
+    hash,
+    hash_many,
+    hash_tree,
+    load_stat_cache,
+    save_stat_cache,
+    stat_signature,
+)
 
 
 def test_hash(tmp_path):
@@ -40,6 +53,18 @@ def test_hash_single_file(tmp_path):
     )
 
 
+@pytest.mark.parametrize("file_digest", [True, False])
+def test_hash_large_file(tmp_path, monkeypatch, file_digest):
+    if not file_digest:
+        monkeypatch.delattr(hashlib, "file_digest", raising=False)
+    monkeypatch.setattr(_hash, "CHUNK_SIZE", 1000)
+    content = bytes(range(256)) * 100
+    tmp_path.joinpath("big").write_bytes(content)
+    tmp_path.joinpath("small").write_bytes(b"small")
+    expected = hashlib.sha256(b"big" + content + b"small" + b"small")
+    assert hash(tmp_path, relative_to=tmp_path) == "sha256:" + expected.hexdigest()
+
+
 def test_hash_walk(tmp_path):
     tmp_path.joinpath("a").touch()
     tmp_path.joinpath("d").mkdir()
@@ -55,3 +80,96 @@ def test_hash_walk(tmp_path):
 def test_hash_not_a_file(tmp_path):
     with pytest.raises(ValueError):
         hash(tmp_path / "a", relative_to=tmp_path)
+
+
+def test_hash_many(tmp_path):
+    jobs = {}
+    for name in ("a", "b", "c"):
+        d = tmp_path / name
+        d.mkdir()
+        d.joinpath("f").write_text(name * 1000)
+        jobs[name] = ([str(d)], str(d))
+    digests = hash_many(jobs, max_workers=2)
+    assert digests == {
+        name: hash(*paths, relative_to=relative_to)
+        for name, (paths, relative_to) in jobs.items()
+    }
+    assert hash_many({}) == {}
+
+
+def test_stat_signature(tmp_path):
+    tmp_path.joinpath("a").write_text("a")
+    tmp_path.joinpath("d").mkdir()
+    tmp_path.joinpath("d", "b").write_text("bb")
+    tmp_path.joinpath("d", ".hidden").touch()
+    signature = stat_signature(tmp_path / "a", tmp_path / "d", relative_to=tmp_path)
+    assert [(path, size) for path, size, _, _ in signature] == [("a", 1), ("d/b", 2)]
+    assert signature == stat_signature(
+        tmp_path / "a", tmp_path / "d", relative_to=tmp_path
+    )
+    tmp_path.joinpath("d", "b").write_text("b")
+    assert signature != stat_signature(
+        tmp_path / "a", tmp_path / "d", relative_to=tmp_path
+    )
+
+
+def test_hash_tree(tmp_path):
+    tmp_path.joinpath("m.py").write_text("{}")
+    tmp_path.joinpath("d").mkdir()
+    tmp_path.joinpath("d", "a").write_text("a")
+    tmp_path.joinpath("d", "e").mkdir()
+    tmp_path.joinpath("d", "e", "b").write_text("b")
+    tree = hash_tree(tmp_path / "m.py", tmp_path / "d", relative_to=tmp_path)
+    assert sorted(tree) == ["", "d", "d/a", "d/e", "d/e/b", "m.py"]
+    assert tree["d/a"] == "sha256:" + hashlib.sha256(b"a").hexdigest()
+    # same content in another place gives the same tree
+    tmp_path.joinpath("d", "a").write_text("a")
+    assert hash_tree(tmp_path / "m.py", tmp_path / "d", relative_to=tmp_path) == tree
+    # a change modifies the file and its ancestors only
+    tmp_path.joinpath("d", "e", "b").write_text("c")
+    new_tree = hash_tree(tmp_path / "m.py", tmp_path / "d", relative_to=tmp_path)
+    assert diff_trees(tree, new_tree) == ["", "d", "d/e", "d/e/b"]
+    # added and removed files
+    tmp_path.joinpath("d", "a").unlink()
+    tmp_path.joinpath("d", "f").touch()
+    newer_tree = hash_tree(tmp_path / "m.py", tmp_path / "d", relative_to=tmp_path)
+    assert diff_trees(new_tree, newer_tree) == ["", "d", "d/a", "d/f"]
+
+
+def test_hash_tree_stat_cache(tmp_path, monkeypatch):
+    tmp_path.joinpath("a").write_text("a")
+    tmp_path.joinpath("b").write_text("b")
+    hashed = []
+    hash_file = _hash._hash_file
+
+    def spy(path):
+        hashed.append(os.path.basename(path))
+        return hash_file(path)
+
+    monkeypatch.setattr(_hash, "_hash_file", spy)
+    stat_cache = {}
+    tree = hash_tree(tmp_path, relative_to=tmp_path, stat_cache=stat_cache)
+    assert hashed == ["a", "b"]
+    assert sorted(stat_cache) == ["a", "b"]
+    hashed.clear()
+    assert hash_tree(tmp_path, relative_to=tmp_path, stat_cache=stat_cache) == tree
+    assert hashed == []
+    tmp_path.joinpath("b").write_text("bb")
+    tmp_path.joinpath("a").unlink()
+    new_tree = hash_tree(tmp_path, relative_to=tmp_path, stat_cache=stat_cache)
+    assert hashed == ["b"]
+    assert sorted(stat_cache) == ["b"]
+    assert diff_trees(tree, new_tree) == ["", "a", "b"]
+
+
+def test_save_load_stat_cache(tmp_path):
+    tmp_path.joinpath("old").write_text("old")
+    os.utime(tmp_path / "old", ns=(10**18, 10**18))
+    tmp_path.joinpath("new").write_text("new")
+    stat_cache = {}
+    hash_tree(tmp_path, relative_to=tmp_path, stat_cache=stat_cache)
+    assert sorted(stat_cache) == ["new", "old"]
+    save_stat_cache(str(tmp_path), stat_cache)
+    # the recently modified file is not trusted
+    assert sorted(load_stat_cache(str(tmp_path))) == ["old"]
+    assert load_stat_cache("other") == {}
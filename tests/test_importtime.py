@@ -0,0 +1,54 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+"""Import time budgets of the entry points run by pre-commit."""
+
+import re
+import subprocess
+import sys
+
+import pytest
+
+# heavy dependencies that must only be imported when used
+LAZY_MODULES = {"docutils", "erppeek", "github3", "jinja2", "pypandoc", "selenium"}
+
+# cumulative import time budget of each module, in milliseconds; they are
+# several times the actual import times, to avoid spurious failures on slow
+# machines while still catching eager imports of heavy dependencies
+BUDGETS = {
+    "tools.gen_addon_readme": 300,
+    "tools.gen_addons_table": 200,
+    "tools.gen_addon_icon": 200,
+    "tools.update_pre_commit_excluded_addons": 200,
+    "tools.fix_manifest_website": 200,
+    "tools.github_login": 200,
+    "tools.odoo_login": 200,
+    "tools.publish_modules": 250,
+}
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def _importtime(module):
+    """Return the cumulative import time of module in us and imported modules."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stderr=subprocess.PIPE,
+        check=True,
+        text=True,
+    ).stderr
+    cumulative = None
+    imported = set()
+    for line in stderr.splitlines():
+        mo = IMPORTTIME_RE.match(line)
+        if not mo:
+            continue
+        imported.add(mo.group(3))
+        if mo.group(3) == module:
+            cumulative = int(mo.group(1))
+    return cumulative, imported
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS))
+def test_importtime(module):
+    cumulative, imported = _importtime(module)
+    assert not {m.split(".")[0] for m in imported} & LAZY_MODULES
+    assert cumulative / 1000 < BUDGETS[module]
@@ -18,3 +18,78 @@ def test_manifest_find_addons_uninstallable():
     addons = list(manifest.find_addons(TEST_REPO_DIR, installable_only=False))
     assert len(addons) == 2
     assert set((addons[0][0], addons[1][0])) == set(("module1", "module2"))
+
+
+def test_read_manifest_cache(tmp_path):
+    addon_dir = tmp_path / "addon"
+    addon_dir.mkdir()
+    manifest_path = addon_dir / "__manifest__.py"
+    manifest_path.write_text("{'name': 'Addon', 'version': '1.0'}")
+    m1 = manifest.read_manifest(str(addon_dir))
+    assert m1 == {"name": "Addon", "version": "1.0"}
+    assert manifest.read_manifest(str(addon_dir)) is m1
+    # a change of size is detected
+    manifest_path.write_text("{'name': 'Addon', 'version': '1.0.1'}")
+    m2 = manifest.read_manifest(str(addon_dir))
+    assert m2["version"] == "1.0.1"
+    # a change keeping mtime and size requires explicit invalidation
+    st = manifest_path.stat()
+    manifest_path.write_text("{'name': 'Addon', 'version': '1.0.2'}")
+    os.utime(manifest_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert manifest.read_manifest(str(addon_dir)) is m2
+    manifest.clear_manifest_cache(str(addon_dir))
+    assert manifest.read_manifest(str(addon_dir))["version"] == "1.0.2"
+
+
+def test_read_manifest_keys(tmp_path):
+    addon_dir = tmp_path / "addon"
+    addon_dir.mkdir()
+    (addon_dir / "__manifest__.py").write_text(
+        "# comment\n{'name': 'Addon', 'installable': False, 'data': ['a.xml']}\n"
+    )
+    assert manifest.read_manifest(str(addon_dir), keys=["installable", "version"]) == {
+        "installable": False
+    }
+    assert manifest.read_manifest(str(addon_dir))["data"] == ["a.xml"]
+
+
+def test_find_addons_manifest_names(tmp_path):
+    (tmp_path / "README.md").write_text("")
+    for addon_name, manifest_names in (
+        ("addon1", ["__manifest__.py", "__openerp__.py"]),
+        ("addon2", ["__terp__.py"]),
+        ("addon3", []),
+    ):
+        addon_dir = tmp_path / addon_name
+        addon_dir.mkdir()
+        for manifest_name in manifest_names:
+            (addon_dir / manifest_name).write_text(repr({"name": manifest_name}))
+    addons = sorted(manifest.find_addons(str(tmp_path)))
+    assert [(name, m["name"]) for name, _, m in addons] == [
+        ("addon1", "__manifest__.py"),
+        ("addon2", "__terp__.py"),
+    ]
+
+
+def test_find_addons_jobs(tmp_path):
+    for i in range(5):
+        addon_dir = tmp_path / f"addon{i}"
+        addon_dir.mkdir()
+        (addon_dir / "__manifest__.py").write_text(
+            repr({"name": f"Addon {i}", "installable": i != 2})
+        )
+    addons = sorted(manifest.find_addons(str(tmp_path), jobs=2))
+    assert [name for name, _, _ in addons] == ["addon0", "addon1", "addon3", "addon4"]
+    assert addons[0][2] is manifest.read_manifest(str(tmp_path / "addon0"))
+
+
+def test_manifest_counters(tmp_path):
+    addon_dir = tmp_path / "addon"
+    addon_dir.mkdir()
+    (addon_dir / "__manifest__.py").write_text("{'name': 'Addon'}")
+    counters = manifest.manifest_counters.copy()
+    manifest.read_manifest(str(addon_dir))
+    manifest.read_manifest(str(addon_dir))
+    assert manifest.manifest_counters["parsed"] - counters["parsed"] == 1
+    assert manifest.manifest_counters["cache_hits"] - counters["cache_hits"] == 1
+    assert manifest.manifest_counters["parse_ns"] > counters["parse_ns"]
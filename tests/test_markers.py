@@ -0,0 +1,50 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+
+import os
+
+from tools._markers import replace_marked_regions
+
+
+def _replace(path, region):
+    return replace_marked_regions(
+        str(path),
+        lambda line: "# BEGIN" in line,
+        lambda line: "# END" in line,
+        lambda start_line: region,
+    )
+
+
+def test_replace_marked_regions(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("head\n  # BEGIN\nold\n# END\ntail\n")
+    os.chmod(path, 0o640)
+    assert _replace(path, "new1\nnew2\n") is True
+    assert path.read_text() == "head\n  # BEGIN\nnew1\nnew2\n# END\ntail\n"
+    assert path.stat().st_mode & 0o777 == 0o640
+    # unchanged region: the file is not rewritten
+    inode = path.stat().st_ino
+    assert _replace(path, "new1\nnew2\n") is False
+    assert path.stat().st_ino == inode
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".tmp-")]
+
+
+def test_replace_marked_regions_no_markers(tmp_path):
+    path = tmp_path / "file.txt"
+    for content in ("head\ntail\n", "head\n# BEGIN\nold\n"):
+        path.write_text(content)
+        assert _replace(path, "new\n") is None
+        assert path.read_text() == content
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".tmp-")]
+
+
+def test_replace_marked_regions_symlink(tmp_path):
+    target_dir = tmp_path / "shared"
+    target_dir.mkdir()
+    target = target_dir / "file.txt"
+    target.write_text("# BEGIN\nold\n# END\n")
+    link = tmp_path / "link.txt"
+    link.symlink_to(os.path.join("shared", "file.txt"))
+    assert _replace(link, "new\n") is True
+    assert link.is_symlink()
+    assert target.read_text() == "# BEGIN\nnew\n# END\n"
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".tmp-")]
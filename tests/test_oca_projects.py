@@ -0,0 +1,194 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tools import oca_projects
+
+
+@pytest.fixture
+def fake_github(monkeypatch):
+    calls = []
+
+    def get_repositories(org_name="OCA"):
+        calls.append(org_name)
+        if isinstance(repositories, Exception):
+            raise repositories
+        return list(repositories)
+
+    repositories = ["web", "account-invoicing"]
+    monkeypatch.setattr(oca_projects, "get_repositories", get_repositories)
+    monkeypatch.setattr(oca_projects, "_repository_names", {})
+
+    class FakeGitHub:
+        def set_repositories(self, value):
+            nonlocal repositories
+            repositories = value
+
+    fake = FakeGitHub()
+    fake.calls = calls
+    return fake
+
+
+def test_no_network_at_import():
+    res = subprocess.run(
+        [sys.executable, "-c", "import tools.oca_projects"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        check=True,
+    )
+    assert res.stdout == b""
+
+
+def test_get_repository_names(fake_github, monkeypatch):
+    assert oca_projects.get_repository_names() == ["account-invoicing", "web"]
+    assert oca_projects.OCA_REPOSITORY_NAMES == ["account-invoicing", "web"]
+    assert fake_github.calls == ["OCA"]
+    # a new process uses the persistent cache
+    monkeypatch.setattr(oca_projects, "_repository_names", {})
+    fake_github.set_repositories(["web"])
+    assert oca_projects.get_repository_names() == ["account-invoicing", "web"]
+    assert fake_github.calls == ["OCA"]
+    # unless it is refreshed or expired
+    assert oca_projects.get_repository_names(refresh=True) == ["web"]
+    fake_github.set_repositories(["server-tools"])
+    assert oca_projects.get_repository_names(ttl=-1) == ["web"]
+    monkeypatch.setattr(oca_projects, "_repository_names", {})
+    assert oca_projects.get_repository_names(ttl=-1) == ["server-tools"]
+    assert len(fake_github.calls) == 3
+
+
+def test_get_repository_names_offline(fake_github, monkeypatch):
+    fake_github.set_repositories(RuntimeError("offline"))
+    with pytest.raises(RuntimeError):
+        oca_projects.get_repository_names()
+    assert oca_projects.OCA_REPOSITORY_NAMES == []
+    # an expired catalog is better than nothing
+    fake_github.set_repositories(["web"])
+    oca_projects.get_repository_names()
+    fake_github.set_repositories(RuntimeError("offline"))
+    assert oca_projects.get_repository_names(refresh=True) == ["web"]
+
+
+def _git(cwd, *args):
+    return subprocess.check_output(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+        + list(args),
+        cwd=cwd,
+        universal_newlines=True,
+    )
+
+
+@pytest.fixture
+def remote_repo(tmp_path, monkeypatch):
+    """A local repository standing in for OCA/web, with branches 16.0 and 17.0."""
+    repo_dir = tmp_path / "web"
+    _git(tmp_path, "init", "--quiet", "--initial-branch=16.0", str(repo_dir))
+    # allow partial clones from this repository
+    _git(repo_dir, "config", "uploadpack.allowFilter", "true")
+    for i in range(3):
+        (repo_dir / "README").write_text(str(i))
+        _git(repo_dir, "add", "README")
+        _git(repo_dir, "commit", "--quiet", "-m", str(i))
+    _git(repo_dir, "branch", "17.0")
+    monkeypatch.setattr(
+        oca_projects,
+        "url",
+        # file:// as git ignores --depth and --filter for local paths
+        lambda project_name, protocol="git", org_name="OCA": repo_dir.as_uri(),
+    )
+    return repo_dir
+
+
+def _cached_branches(cache_dir):
+    return _git(cache_dir / "github.com" / "oca" / "web", "branch").split()
+
+
+def test_temporary_clone(remote_repo, cache_dir):
+    with oca_projects.temporary_clone("web", "17.0"):
+        assert _git(".", "rev-list", "--count", "HEAD").strip() == "3"
+        remote_branches = _git(".", "branch", "-r")
+        assert "origin/16.0" in remote_branches
+        assert "origin/17.0" in remote_branches
+    assert _cached_branches(cache_dir) == ["16.0", "17.0"]
+
+
+def test_temporary_clone_single_branch(remote_repo, cache_dir):
+    with oca_projects.temporary_clone("web", "17.0", single_branch=True):
+        assert _git(".", "rev-list", "--count", "HEAD").strip() == "3"
+        assert _git(".", "branch", "-r").split() == ["origin/17.0"]
+    assert _cached_branches(cache_dir) == ["17.0"]
+
+
+def test_temporary_clone_shallow(remote_repo, cache_dir):
+    with oca_projects.temporary_clone("web", "17.0", single_branch=True, depth=1):
+        assert _git(".", "rev-list", "--count", "HEAD").strip() == "1"
+        assert _git(".", "branch", "-r").split() == ["origin/17.0"]
+    # the cache is not used
+    assert not (cache_dir / "github.com").exists()
+
+
+def test_temporary_clone_partial(remote_repo, cache_dir):
+    with oca_projects.temporary_clone("web", "17.0", blob_filter="blob:none"):
+        assert _git(".", "config", "remote.origin.promisor").strip() == "true"
+        assert _git(".", "rev-list", "--count", "HEAD").strip() == "3"
+        with open("README") as f:
+            assert f.read() == "2"
+    assert not (cache_dir / "github.com").exists()
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"single_branch": True}, {"depth": 1}, {"blob_filter": "blob:none"}]
+)
+def test_temporary_clone_branch_not_found(remote_repo, options):
+    with pytest.raises(oca_projects.BranchNotFoundError):
+        with oca_projects.temporary_clone("web", "18.0", **options):
+            pass
+
+
+def test_update_repo_cache_skips_fetch(remote_repo, cache_dir):
+    repo_cache_dir = oca_projects.update_repo_cache("web")
+    fetch_head = os.path.join(repo_cache_dir, "FETCH_HEAD")
+    assert os.path.exists(fetch_head)
+    os.unlink(fetch_head)
+    # unchanged on the remote, according to git ls-remote
+    oca_projects.update_repo_cache("web")
+    assert not os.path.exists(fetch_head)
+    (remote_repo / "README").write_text("changed")
+    _git(remote_repo, "commit", "--quiet", "-am", "changed")
+    # fetched less than ttl seconds ago
+    oca_projects.update_repo_cache("web", ttl=3600)
+    oca_projects.update_repo_cache("web", branch="16.0", ttl=3600)
+    assert not os.path.exists(fetch_head)
+    oca_projects.update_repo_cache("web")
+    assert os.path.exists(fetch_head)
+    assert _git(repo_cache_dir, "log", "-1", "--format=%s", "16.0").strip() == (
+        "changed"
+    )
+
+
+def test_update_repo_cache_branch_ttl(remote_repo, cache_dir):
+    repo_cache_dir = oca_projects.update_repo_cache("web", branch="17.0")
+    assert _cached_branches(cache_dir) == ["17.0"]
+    # a fresh fetch of a branch does not make the other branches fresh
+    oca_projects.update_repo_cache("web", ttl=3600)
+    assert _cached_branches(cache_dir) == ["16.0", "17.0"]
+    fetch_head = os.path.join(repo_cache_dir, "FETCH_HEAD")
+    os.unlink(fetch_head)
+    (remote_repo / "README").write_text("changed")
+    _git(remote_repo, "commit", "--quiet", "-am", "changed")
+    # but a fetch of all branches does
+    oca_projects.update_repo_cache("web", branch="17.0", ttl=3600)
+    assert not os.path.exists(fetch_head)
+
+
+@pytest.mark.parametrize("single_branch", [False, True])
+def test_temporary_clone_new_branch_within_ttl(remote_repo, single_branch):
+    with oca_projects.temporary_clone("web", "16.0"):
+        pass
+    _git(remote_repo, "branch", "18.0")
+    with oca_projects.temporary_clone("web", "18.0", single_branch=single_branch):
+        assert _git(".", "branch", "--show-current").strip() == "18.0"
@@ -0,0 +1,114 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+"""On-disk caches shared by the oca-* tools."""
+
+import hashlib
+import os
+import tempfile
+from typing import Optional, Union
+
+import appdirs
+
+CACHE_DIR_ENV = "OCA_TOOLS_CACHE_DIR"
+
+# Stat data of files modified less than this number of nanoseconds before
+# being recorded is not trusted, as they may be modified again without
+# changing their mtime (see "racy git").
+RACY_DELAY_NS = 2 * 10**9
+
+
+def get_cache_dir(*names: str) -> str:
+    """Return a directory of the user cache, creating it if needed.
+
+    The base directory can be changed with the OCA_TOOLS_CACHE_DIR
+    environment variable.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENV) or appdirs.user_cache_dir("oca-mqt")
+    cache_dir = os.path.join(cache_dir, *names)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def make_key(*parts: Union[str, bytes]) -> str:
+    """Make a cache key from the given parts."""
+    m = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        # prefix each part by its length so parts can't run into each other
+        m.update(b"%d:" % len(part))
+        m.update(part)
+    return m.hexdigest()
+
+
+class FileCache:
+    """A content-addressed cache storing one file per entry.
+
+    When the total size of the entries exceeds max_size, the least recently
+    used entries are evicted. Entries are written atomically, so the cache
+    can be shared by concurrent processes.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self._size: Optional[int] = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            # mark as recently used
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        else:
+            self._size += len(data)
+        if self._size > self.max_size:
+            self.evict()
+
+    def _entries(self):
+        """Yield (mtime_ns, size, path) of cache entries."""
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    # removed by a concurrent process
+                    continue
+                yield st.st_mtime_ns, st.st_size, entry.path
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits max_size."""
+        entries = sorted(self._entries())
+        size = sum(size for _, size, _ in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        self._size = size
@@ -0,0 +1,172 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+"""A minimal GitHub API client for concurrent enumerations.
+
+Unlike github3, it follows the rate limit headers of GitHub responses,
+waiting for the rate limit to reset instead of failing, and it is safe
+to use from several threads.
+"""
+
+import concurrent.futures
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+GITHUB_API_URL = "https://api.github.com"
+
+# number of items per page, the maximum allowed by GitHub
+PER_PAGE = 100
+
+REPOSITORIES_AND_BRANCHES_QUERY = """
+query($org: String!, $cursor: String) {
+  organization(login: $org) {
+    repositories(first: 100, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        refs(refPrefix: "refs/heads/", first: 100) {
+          pageInfo { hasNextPage }
+          nodes { name }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+class GitHubAPIError(RuntimeError):
+    pass
+
+
+class GitHubAPI:
+    def __init__(self, token: Optional[str], api_url: Optional[str] = None):
+        import requests
+
+        if not api_url:
+            # GITHUB_API_URL is set by GitHub Actions, also for GitHub Enterprise
+            api_url = os.environ.get("GITHUB_API_URL") or GITHUB_API_URL
+        self.api_url = api_url.rstrip("/")
+        self.session = requests.Session()
+        self.session.headers["Accept"] = "application/vnd.github+json"
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self._lock = threading.Lock()
+        # time until which all requests must wait for the rate limit reset
+        self._blocked_until = 0.0
+        self._sleep = time.sleep
+
+    def _wait_rate_limit(self):
+        with self._lock:
+            delay = self._blocked_until - time.time()
+        if delay > 0:
+            self._sleep(delay)
+
+    def _update_rate_limit(self, response) -> bool:
+        """Record the rate limit state of response.
+
+        Return True if the request was rejected by the rate limit and must be
+        retried.
+        """
+        headers = response.headers
+        blocked_until = None
+        if (
+            headers.get("X-RateLimit-Remaining") == "0"
+            and "X-RateLimit-Reset" in headers
+        ):
+            # primary rate limit exhausted, wait for its reset
+            blocked_until = int(headers["X-RateLimit-Reset"]) + 1
+        if response.status_code in (403, 429) and "Retry-After" in headers:
+            # secondary rate limit
+            blocked_until = time.time() + int(headers["Retry-After"])
+        if blocked_until is None:
+            return False
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, blocked_until)
+        return response.status_code in (403, 429)
+
+    def request(self, method: str, url: str, **kwargs):
+        if not url.startswith(("http://", "https://")):
+            url = self.api_url + url
+        while True:
+            self._wait_rate_limit()
+            response = self.session.request(method, url, **kwargs)
+            if not self._update_rate_limit(response):
+                break
+        if response.status_code >= 400:
+            raise GitHubAPIError(
+                f"{method} {url}: {response.status_code} {response.text}"
+            )
+        return response
+
+    def paginate(self, url: str, params: Optional[dict] = None) -> List[dict]:
+        """Return the items of all the pages of a REST API list."""
+        items = []
+        params = dict(params or {}, per_page=PER_PAGE)
+        while url:
+            response = self.request("GET", url, params=params)
+            items.extend(response.json())
+            url = response.links.get("next", {}).get("url")
+            # the next url includes the parameters
+            params = None
+        return items
+
+    def graphql(self, query: str, variables: dict) -> dict:
+        response = self.request(
+            "POST", "/graphql", json={"query": query, "variables": variables}
+        )
+        result = response.json()
+        if result.get("errors"):
+            raise GitHubAPIError(f"GraphQL errors: {result['errors']}")
+        return result["data"]
+
+    def get_repository_names(self, org_name: str) -> List[str]:
+        return [repo["name"] for repo in self.paginate(f"/orgs/{org_name}/repos")]
+
+    def get_branch_names(self, org_name: str, repo_name: str) -> List[str]:
+        return [
+            branch["name"]
+            for branch in self.paginate(f"/repos/{org_name}/{repo_name}/branches")
+        ]
+
+    def get_repositories_and_branches(
+        self, org_name: str, max_workers: int = 8
+    ) -> Dict[str, List[str]]:
+        """Return {repository name: branch names} for an organization.
+
+        The branches of the repositories are listed concurrently.
+        """
+        repo_names = self.get_repository_names(org_name)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
+            branches = ex.map(
+                lambda repo_name: self.get_branch_names(org_name, repo_name),
+                repo_names,
+            )
+            return dict(zip(repo_names, branches))
+
+    def get_repositories_and_branches_graphql(
+        self, org_name: str
+    ) -> Dict[str, List[str]]:
+        """Return {repository name: branch names} for an organization.
+
+        Repositories are listed with their branches in bulk with GraphQL. The
+        branches of the few repositories that have more than a page of
+        branches are listed with the REST API.
+        """
+        result = {}
+        cursor = None
+        while True:
+            data = self.graphql(
+                REPOSITORIES_AND_BRANCHES_QUERY, {"org": org_name, "cursor": cursor}
+            )
+            repositories = data["organization"]["repositories"]
+            for repo in repositories["nodes"]:
+                if repo["refs"]["pageInfo"]["hasNextPage"]:
+                    result[repo["name"]] = self.get_branch_names(org_name, repo["name"])
+                else:
+                    result[repo["name"]] = [
+                        ref["name"] for ref in repo["refs"]["nodes"]
+                    ]
+            if not repositories["pageInfo"]["hasNextPage"]:
+                return result
+            cursor = repositories["pageInfo"]["endCursor"]
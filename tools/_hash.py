@@ -1,8 +1,22 @@
 # Copyright 2023 ACSONE SA/NV.
 # License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
 
+import concurrent.futures
+import functools
 import hashlib
+import json
 import os
+import time
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, TypeVar
+
+from . import _profile
+from ._cache import RACY_DELAY_NS, FileCache, get_cache_dir, make_key
+
+# size of the chunks read when hashing files, on python < 3.11
+CHUNK_SIZE = 256 * 1024
+
+# size of the cache of stat caches for hash_tree()
+STAT_CACHES_MAX_SIZE = 16 * 1024 * 1024
 
 
 def _walk(*args, relative_to):
@@ -26,6 +40,24 @@ def _walk(*args, relative_to):
             raise ValueError("Not a file or directory: %r" % arg)
 
 
+def _update_from_file(m, f):
+    """Update hash object m with the content of binary file f, by chunks."""
+    if _profile.is_enabled():
+        _profile.count("bytes_hashed", os.fstat(f.fileno()).st_size)
+    if hasattr(hashlib, "file_digest"):
+        # python >= 3.11: file_digest accepts a callable returning the hash
+        # object to update, so it can feed our running hash
+        hashlib.file_digest(f, lambda: m)
+        return
+    buf = bytearray(CHUNK_SIZE)
+    view = memoryview(buf)
+    while True:
+        size = f.readinto(buf)
+        if not size:
+            break
+        m.update(view[:size])
+
+
 def hash(*args, relative_to):
     """Compute a sha256 digest of file contents."""
     m = hashlib.sha256()
@@ -34,5 +66,137 @@ def hash(*args, relative_to):
         m.update(filepath.encode("utf-8"))
         # hash file content
         with open(os.path.join(relative_to, filepath), "rb") as f:
-            m.update(f.read())
+            _update_from_file(m, f)
     return m.name + ":" + m.hexdigest()
+
+
+K = TypeVar("K")
+
+
+def hash_many(
+    jobs: Mapping[K, Tuple[Sequence, str]], max_workers: Optional[int] = None
+) -> Dict[K, str]:
+    """Compute hash() for many jobs concurrently.
+
+    jobs maps keys chosen by the caller to (paths, relative_to) tuples, and
+    the result maps the same keys to the digests. The jobs run on a thread
+    pool, as hashlib releases the GIL while hashing large buffers.
+    """
+    if not jobs:
+        return {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            key: executor.submit(hash, *paths, relative_to=relative_to)
+            for key, (paths, relative_to) in jobs.items()
+        }
+        return {key: future.result() for key, future in futures.items()}
+
+
+DigestTree = Dict[str, str]
+StatCache = Dict[str, list]
+
+
+def _hash_file(path):
+    m = hashlib.sha256()
+    with open(path, "rb") as f:
+        _update_from_file(m, f)
+    return m.name + ":" + m.hexdigest()
+
+
+def _depth(path):
+    return path.count(os.sep) + 1 if path else 0
+
+
+def hash_tree(*args, relative_to, stat_cache: Optional[StatCache] = None) -> DigestTree:
+    """Compute a Merkle tree of sha256 digests of file contents.
+
+    Return a mapping of paths relative to relative_to to their digest,
+    for the files found in args (like hash()) and all their parent
+    directories, up to relative_to itself which has path "". The digest of
+    a directory is computed from the names and digests of its children.
+
+    If a stat_cache dictionary is given, the digests of files whose stat data
+    is unchanged are taken from it instead of reading the files, and it is
+    updated with the new digests. So when one file changes, only this file
+    is read, and only its ancestors get a new digest.
+    """
+    tree = {}
+    children = {"": set()}
+    for filepath in _walk(*args, relative_to=relative_to):
+        path = os.path.join(relative_to, filepath)
+        if stat_cache is None:
+            digest = _hash_file(path)
+        else:
+            st = os.stat(path)
+            stat = [st.st_size, st.st_mtime_ns, st.st_ino]
+            cached = stat_cache.get(filepath)
+            if cached and cached[:3] == stat:
+                digest = cached[3]
+            else:
+                digest = _hash_file(path)
+                stat_cache[filepath] = stat + [digest]
+        tree[filepath] = digest
+        while filepath:
+            parent = os.path.dirname(filepath)
+            children.setdefault(parent, set()).add(filepath)
+            filepath = parent
+    if stat_cache is not None:
+        for filepath in set(stat_cache) - set(tree):
+            del stat_cache[filepath]
+    # compute directory digests from the deepest ones up to the root
+    for dirpath in sorted(children, key=_depth, reverse=True):
+        m = hashlib.sha256()
+        for child in sorted(children[dirpath]):
+            m.update(f"{os.path.basename(child)}\0{tree[child]}\n".encode("utf-8"))
+        tree[dirpath] = m.name + ":" + m.hexdigest()
+    return tree
+
+
+def diff_trees(old: DigestTree, new: DigestTree) -> List[str]:
+    """Return the sorted paths that differ between two digest trees.
+
+    These are the files and directories that were added, removed or modified.
+    """
+    return sorted(
+        path for path in old.keys() | new.keys() if old.get(path) != new.get(path)
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _get_stat_caches(cache_dir: str) -> FileCache:
+    return FileCache(cache_dir, STAT_CACHES_MAX_SIZE)
+
+
+def load_stat_cache(name: str) -> StatCache:
+    """Load a stat cache for hash_tree() from the user cache."""
+    data = _get_stat_caches(get_cache_dir("stat-caches")).get(make_key(name))
+    return json.loads(data) if data else {}
+
+
+def save_stat_cache(name: str, stat_cache: StatCache) -> None:
+    """Save a stat cache for hash_tree() in the user cache.
+
+    Entries of files modified too recently to be trusted are not saved.
+    """
+    racy_limit = time.time_ns() - RACY_DELAY_NS
+    stat_cache = {
+        filepath: entry
+        for filepath, entry in stat_cache.items()
+        if entry[1] < racy_limit
+    }
+    _get_stat_caches(get_cache_dir("stat-caches")).set(
+        make_key(name), json.dumps(stat_cache).encode("utf-8")
+    )
+
+
+def stat_signature(*args, relative_to):
+    """Return the stat data of the files that hash() would read.
+
+    This is a list of [path, size, mtime_ns, inode] lists, that can be
+    used to detect changes without reading file contents.
+    """
+    signature = []
+    for filepath in _walk(*args, relative_to=relative_to):
+        st = os.stat(os.path.join(relative_to, filepath))
+        signature.append([filepath, st.st_size, st.st_mtime_ns, st.st_ino])
+    return signature
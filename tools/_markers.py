@@ -0,0 +1,64 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+"""Rewrite the regions of text files delimited by marker lines."""
+
+import os
+import shutil
+import tempfile
+from typing import Callable, Optional
+
+
+def replace_marked_regions(
+    file_path: str,
+    is_start: Callable[[str], bool],
+    is_end: Callable[[str], bool],
+    make_region: Callable[[str], str],
+    encoding: Optional[str] = None,
+) -> Optional[bool]:
+    """Replace the lines between start and end marker lines.
+
+    The file is streamed line by line to a temporary file, which replaces the
+    original file atomically. The marker lines are kept, and the lines between
+    them are replaced by make_region(start_line). is_end is checked before
+    is_start, so an end marker may contain the start marker.
+
+    Return None if no complete region was found, in which case the file is
+    left untouched. Otherwise return True if the file was modified, False if
+    the regions were already up to date and the file was left untouched.
+    """
+    # write through symlinks, replacing their target
+    file_path = os.path.realpath(file_path)
+    dir_name = os.path.dirname(file_path)
+    fd, tmp_path = tempfile.mkstemp(dir=dir_name, prefix=".tmp-")
+    try:
+        found = changed = False
+        with open(file_path, encoding=encoding) as src, os.fdopen(
+            fd, "w", encoding=encoding
+        ) as dst:
+            old_region = new_region = None
+            for line in src:
+                if old_region is not None:
+                    if not is_end(line):
+                        old_region.append(line)
+                        continue
+                    dst.write(new_region)
+                    if "".join(old_region) != new_region:
+                        changed = True
+                    old_region = None
+                    found = True
+                elif is_start(line) and not is_end(line):
+                    old_region = []
+                    new_region = make_region(line)
+                dst.write(line)
+            if old_region is not None:
+                # start marker without end marker
+                found = False
+        if not found or not changed:
+            os.unlink(tmp_path)
+            return None if not found else False
+        shutil.copymode(file_path, tmp_path)
+        os.replace(tmp_path, file_path)
+        return True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
@@ -0,0 +1,112 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+"""Optional timing instrumentation of the oca-* tools.
+
+When enabled, the time spent in named phases is recorded per addon, along
+with counters (pandoc invocations, bytes hashed, ...). Recording is a no-op
+otherwise.
+"""
+
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import click
+
+PROFILE_ENV = "OCA_TOOLS_PROFILE"
+
+_enabled = os.environ.get(PROFILE_ENV, "").lower() not in ("", "0", "false", "no")
+_lock = threading.Lock()
+# {addon_name: {phase: seconds}}, with "" for phases not specific to an addon
+_timings: Dict[str, Dict[str, float]] = {}
+_counters: "collections.Counter[str]" = collections.Counter()
+
+
+def enable() -> None:
+    """Enable profiling, in this process and in its subprocesses."""
+    global _enabled
+    _enabled = True
+    os.environ[PROFILE_ENV] = "1"
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+@contextlib.contextmanager
+def phase(name: str, addon_name: str = ""):
+    """Record the time spent in the with block as phase name of addon_name."""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            phases = _timings.setdefault(addon_name, {})
+            phases[name] = phases.get(name, 0.0) + elapsed
+
+
+def count(name: str, n: int = 1) -> None:
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] += n
+
+
+def take() -> Optional[dict]:
+    """Return the data recorded so far and reset it, or None if disabled."""
+    if not _enabled:
+        return None
+    with _lock:
+        data = {"timings": dict(_timings), "counters": dict(_counters)}
+        _timings.clear()
+        _counters.clear()
+    return data
+
+
+def merge(data: Optional[dict]) -> None:
+    """Add data returned by take() in another process."""
+    if not data:
+        return
+    with _lock:
+        for addon_name, phases in data["timings"].items():
+            own_phases = _timings.setdefault(addon_name, {})
+            for name, elapsed in phases.items():
+                own_phases[name] = own_phases.get(name, 0.0) + elapsed
+        _counters.update(data["counters"])
+
+
+def report(json_filename: Optional[str] = None) -> None:
+    """Print a summary of the recorded data on stderr, and its JSON dump.
+
+    The JSON dump goes to json_filename if given, or else to stderr after
+    the summary.
+    """
+    data = take()
+    if data is None:
+        return
+    phases: Dict[str, list] = {}
+    for addon_name, addon_phases in data["timings"].items():
+        for name, elapsed in addon_phases.items():
+            phases.setdefault(name, []).append((elapsed, addon_name))
+    lines = [f"{'phase':<20} {'total s':>9} {'addons':>7} {'max s':>9}  slowest addon"]
+    for name, timings in sorted(phases.items(), key=lambda p: -sum(t for t, _ in p[1])):
+        slowest, slowest_addon = max(timings)
+        lines.append(
+            f"{name:<20} {sum(t for t, _ in timings):>9.3f} "
+            f"{len([a for _, a in timings if a]):>7} {slowest:>9.3f}  {slowest_addon}"
+        )
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f"{name:<20} {value:>9}")
+    click.echo("\n".join(lines), err=True)
+    if json_filename:
+        with open(json_filename, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+    else:
+        click.echo(json.dumps(data, sort_keys=True), err=True)
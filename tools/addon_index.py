@@ -0,0 +1,106 @@
+# License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
+"""Persistent index of the addons of a directory.
+
+The index records, for each addon, the stat data and digest of its manifest
+along with the manifest keys that whole-repository tools need. It is stored
+in the user cache and refreshed incrementally, so each manifest is parsed
+only when it changes, even across several oca-* commands.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import time
+from typing import Dict
+
+from ._cache import RACY_DELAY_NS, FileCache, get_cache_dir, make_key
+from .manifest import _find_manifest_paths, _load_manifest_file, manifest_counters
+
+# bump when the format of entries changes
+ADDON_INDEX_VERSION = 1
+
+# manifest keys recorded in the index
+INDEXED_KEYS = (
+    "name",
+    "version",
+    "installable",
+    "maintainers",
+    "summary",
+    "preloadable",
+    "website",
+)
+
+ADDON_INDEX_CACHE_MAX_SIZE = 16 * 1024 * 1024
+
+
+@functools.lru_cache(maxsize=None)
+def _get_addon_index_cache(cache_dir):
+    return FileCache(cache_dir, ADDON_INDEX_CACHE_MAX_SIZE)
+
+
+def _index_addon(manifest_path):
+    """Return the index entry of the addon with the given manifest."""
+    st, data, manifest = _load_manifest_file(manifest_path, INDEXED_KEYS)
+    return {
+        "manifest_name": os.path.basename(manifest_path),
+        "stat": [st.st_size, st.st_mtime_ns, st.st_ino],
+        "digest": "sha256:" + hashlib.sha256(data).hexdigest(),
+        "manifest": manifest,
+    }
+
+
+def get_addon_index(addons_dir) -> Dict[str, dict]:
+    """Return the index of the addons in addons_dir.
+
+    The result maps addon names to entries with the manifest_name, stat and
+    digest of the manifest, and a manifest dictionary limited to
+    INDEXED_KEYS. Only the manifests whose stat data changed since the
+    previous call are parsed.
+    """
+    key = make_key(str(ADDON_INDEX_VERSION), os.path.abspath(addons_dir))
+    try:
+        cache = _get_addon_index_cache(get_cache_dir("addon-index"))
+        data = cache.get(key)
+    except OSError:
+        # the index is only a speed-up, all manifests are parsed without it
+        cache = data = None
+    old_index = json.loads(data) if data else {}
+    index = {}
+    # manifests modified just before being indexed may be modified again
+    # without changing their stat data, so they are parsed again next time
+    racy_limit = time.time_ns() - RACY_DELAY_NS
+    for addon_name, _, manifest_path in sorted(_find_manifest_paths(addons_dir)):
+        entry = old_index.get(addon_name)
+        st = os.stat(manifest_path)
+        stat = [st.st_size, st.st_mtime_ns, st.st_ino]
+        if (
+            not entry
+            or entry["manifest_name"] != os.path.basename(manifest_path)
+            or entry["stat"] != stat
+        ):
+            entry = _index_addon(manifest_path)
+            if entry["stat"][1] >= racy_limit:
+                entry["stat"] = None
+        else:
+            manifest_counters["index_hits"] += 1
+        index[addon_name] = entry
+    if index != old_index and cache is not None:
+        try:
+            cache.set(key, json.dumps(index).encode("utf-8"))
+        except OSError:
+            pass
+    return index
+
+
+def find_indexed_addons(addons_dir, installable_only=True):
+    """yield (addon_name, addon_dir, manifest) using the addon index
+
+    This is like manifest.find_addons(), except that manifest only
+    contains INDEXED_KEYS.
+    """
+    for addon_name, entry in get_addon_index(addons_dir).items():
+        manifest = entry["manifest"]
+        if installable_only and not manifest.get("installable", True):
+            continue
+        yield addon_name, os.path.join(addons_dir, addon_name), manifest
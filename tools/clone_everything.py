@@ -2,44 +2,193 @@
 # License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
 
 import argparse
+import concurrent.futures
+import json
 import os
 import subprocess
+import threading
+import time
 
-from .oca_projects import OCA_REPOSITORY_NAMES, url
+from .oca_projects import get_repository_names, update_repo_cache, url
 
+# file recording the repositories processed by an interrupted run
+STATE_FILENAME = ".oca-clone-everything.json"
 
-def clone(organization_remotes=None, remove_old_repos=False, target_branch=False):
-    for project in OCA_REPOSITORY_NAMES:
-        print("Cloning %s ..." % project)
-        cmd = ["git", "clone", "--quiet", url(project), project]
-        if target_branch:
-            cmd += ["-b", target_branch]
+
+def _add_alternate(project, repo_cache_dir):
+    """Make an existing clone borrow objects from the repository cache."""
+    alternates_path = os.path.join(project, ".git", "objects", "info", "alternates")
+    objects_dir = os.path.join(repo_cache_dir, "objects")
+    alternates = []
+    if os.path.exists(alternates_path):
+        with open(alternates_path) as f:
+            alternates = f.read().splitlines()
+    if objects_dir not in alternates:
+        with open(alternates_path, "a") as f:
+            f.write(objects_dir + "\n")
+
+
+def clone_one(project, organization_remotes=None, target_branch=False, reference=False):
+    """Clone a repository, or fetch it if it exists. Return True on success.
+
+    With reference, the branches are first fetched into the bare repository
+    cache shared with temporary_clone(), which the clone then borrows its
+    objects from.
+    """
+    print("Cloning %s ..." % project)
+    repo_cache_dir = None
+    if reference:
         try:
-            subprocess.check_call(cmd)
+            repo_cache_dir = update_repo_cache(project)
+            # the clones may need objects no longer reachable in the cache
+            subprocess.check_call(
+                ["git", "config", "gc.pruneExpire", "never"], cwd=repo_cache_dir
+            )
         except Exception:
+            return False
+    cmd = ["git", "clone", "--quiet"]
+    if repo_cache_dir:
+        cmd += ["--reference", repo_cache_dir]
+    cmd += [url(project), project]
+    if target_branch:
+        cmd += ["-b", target_branch]
+    ok = True
+    try:
+        subprocess.check_call(cmd)
+    except Exception:
+        if repo_cache_dir and os.path.isdir(os.path.join(project, ".git")):
+            _add_alternate(project, repo_cache_dir)
+        cmd = [
+            "git",
+            "--git-dir=" + os.path.join(project, ".git"),
+            "fetch",
+            "--all",
+        ]
+        ok = subprocess.call(cmd) == 0
+    if organization_remotes:
+        for organization_remote in organization_remotes.split(","):
             cmd = [
                 "git",
                 "--git-dir=" + os.path.join(project, ".git"),
-                "fetch",
-                "--all",
+                "remote",
+                "add",
+                organization_remote,
+                url(project, org_name=organization_remote),
             ]
             subprocess.call(cmd)
-        if organization_remotes:
-            for organization_remote in organization_remotes.split(","):
-                cmd = [
-                    "git",
-                    "--git-dir=" + os.path.join(project, ".git"),
-                    "remote",
-                    "add",
-                    organization_remote,
-                    url(project, org_name=organization_remote),
-                ]
-                subprocess.call(cmd)
+    return ok
+
+
+class CloneState:
+    """Repositories already processed, saved so an interrupted run can resume."""
+
+    def __init__(self, filename=STATE_FILENAME):
+        self.filename = filename
+        self.done = set()
+        self._lock = threading.Lock()
+        if os.path.exists(filename):
+            with open(filename) as f:
+                self.done = set(json.load(f)["done"])
+
+    def add(self, project):
+        with self._lock:
+            self.done.add(project)
+            tmp_filename = self.filename + ".tmp"
+            with open(tmp_filename, "w") as f:
+                json.dump({"done": sorted(self.done)}, f)
+            os.replace(tmp_filename, self.filename)
+
+    def remove(self):
+        if os.path.exists(self.filename):
+            os.unlink(self.filename)
+
+
+def _format_duration(seconds):
+    return "%d:%02d" % divmod(int(seconds), 60)
+
+
+def clone(
+    organization_remotes=None,
+    remove_old_repos=False,
+    target_branch=False,
+    refresh_repositories=False,
+    jobs=1,
+    restart=False,
+    reference=False,
+):
+    repository_names = get_repository_names(refresh=refresh_repositories)
+    state = CloneState()
+    if restart:
+        state.remove()
+        state.done.clear()
+    elif state.done:
+        print("Resuming, %d repositories already done" % len(state.done))
+    todo = [p for p in repository_names if p not in state.done]
+    failed = []
+    start = time.monotonic()
+    processed = set()
+
+    def record(future, project):
+        processed.add(future)
+        ok = future.result()
+        if ok:
+            state.add(project)
+        else:
+            failed.append(project)
+        elapsed = time.monotonic() - start
+        eta = elapsed / len(processed) * (len(todo) - len(processed))
+        print(
+            "[%d/%d] %s %s, ETA %s"
+            % (
+                len(processed),
+                len(todo),
+                project,
+                "done" if ok else "failed",
+                _format_duration(eta),
+            )
+        )
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+    futures = {}
+    try:
+        for project in todo:
+            future = executor.submit(
+                clone_one, project, organization_remotes, target_branch, reference
+            )
+            futures[future] = project
+        for future in concurrent.futures.as_completed(futures):
+            record(future, futures[future])
+    except KeyboardInterrupt:
+        print("Interrupted, waiting for the running clones to finish")
+        # Python < 3.9 has no shutdown(cancel_futures=True)
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+        for future, project in futures.items():
+            if future not in processed and not future.cancelled():
+                record(future, project)
+        print("%d repositories done, run again to resume" % len(state.done))
+        raise
+    finally:
+        executor.shutdown(wait=True)
+    elapsed = time.monotonic() - start
+    print(
+        "%d repositories processed in %s (%.1f per minute), %d failed%s"
+        % (
+            len(todo),
+            _format_duration(elapsed),
+            len(todo) / elapsed * 60 if elapsed else 0,
+            len(failed),
+            ": " + ", ".join(sorted(failed)) if failed else "",
+        )
+    )
+    # the run is complete, the next one will update all repositories
+    state.remove()
     if remove_old_repos:
         print("Removing old repositories")
         for d in os.listdir("."):
             if (
-                d not in OCA_REPOSITORY_NAMES
+                d not in repository_names
                 and os.path.isdir(d)
                 and os.path.isdir(os.path.join(d, ".git"))
             ):
@@ -47,6 +196,13 @@ def clone(organization_remotes=None, remove_old_repos=False, target_branch=False
                 subprocess.check_call(["rm", "-fr", d])
 
 
+def _positive_int(value):
+    value = int(value)
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return value
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -76,12 +232,43 @@ def main():
         dest="target_branch",
         help="Add this argument for specifying the branch you want to " "checkout.",
     )
+    parser.add_argument(
+        "--refresh-repositories",
+        action="store_true",
+        help="Fetch the list of OCA repositories from GitHub, instead of "
+        "using the cached one when it is less than a day old.",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=_positive_int,
+        default=1,
+        help="Number of repositories to clone or fetch in parallel.",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Process all repositories, instead of resuming an interrupted "
+        "run from the state recorded in %s." % STATE_FILENAME,
+    )
+    parser.add_argument(
+        "--reference",
+        action="store_true",
+        help="Fetch the repositories into the repository cache shared with "
+        "the other oca-* tools, and make the clones borrow their objects "
+        "from it, so they only store and transfer what the cache lacks. "
+        "The clones then depend on the cache: don't remove it.",
+    )
     args = parser.parse_args()
     org_remotes = args.org_remotes and args.org_remotes[0] or None
     clone(
         organization_remotes=org_remotes,
         remove_old_repos=args.remove_old_repos,
         target_branch=args.target_branch,
+        refresh_repositories=args.refresh_repositories,
+        jobs=args.jobs,
+        restart=args.restart,
+        reference=args.reference,
     )
 
 
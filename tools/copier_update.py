@@ -9,7 +9,12 @@ import click
 import requests
 
 from .gitutils import commit_if_needed
-from .oca_projects import BranchNotFoundError, get_repositories, temporary_clone
+from .oca_projects import (
+    REPO_CACHE_FETCH_TTL,
+    BranchNotFoundError,
+    get_repositories,
+    temporary_clone,
+)
 
 IGNORED_REJ_FILES = ["oca_dependencies.txt.rej"]
 
@@ -132,6 +137,14 @@ def _fix_copier_answers():
 )
 @click.option("--skip-ci/--no-skip-ci", default=False)
 @click.option("--git-protocol", default="git", show_default=True)
+@click.option(
+    "--fetch-ttl",
+    type=click.IntRange(min=0),
+    default=REPO_CACHE_FETCH_TTL,
+    show_default=True,
+    help="Don't update the repository cache if it was less than this number "
+    "of seconds ago.",
+)
 def main(
     org: str,
     repos: str,
@@ -140,11 +153,18 @@ def main(
     git_user_email: str,
     skip_ci: bool,
     git_protocol: str,
+    fetch_ttl: int,
 ) -> None:
     for repo, branch in _iterate_repos_and_branches(repos, branches):
         try:
+            # only the branch to update is needed
             with temporary_clone(
-                org_name=org, project_name=repo, branch=branch, protocol=git_protocol
+                org_name=org,
+                project_name=repo,
+                branch=branch,
+                protocol=git_protocol,
+                single_branch=True,
+                fetch_ttl=fetch_ttl,
             ):
                 print("=" * 10, repo, branch, "=" * 10)
                 if git_user_name:
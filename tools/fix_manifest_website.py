@@ -5,7 +5,7 @@ import re
 
 import click
 
-from .manifest import get_manifest_path, parse_manifest
+from .manifest import clear_manifest_cache, get_manifest_path, read_manifest
 
 WEBSITE_KEY_RE = re.compile(r"""(["']website["']\s*:\s*["'])([^"']*)(["'])""")
 
@@ -19,8 +19,9 @@ def main(url, addons_dir):
         if not manifest_path:
             continue
         try:
-            with open(manifest_path) as manifest_file:
-                manifest = parse_manifest(manifest_file.read())
+            manifest = read_manifest(
+                os.path.join(addons_dir, addon_dir), keys=("website",)
+            )
         except Exception:
             raise click.ClickException(
                 "Error parsing manifest {}.".format(manifest_path)
@@ -45,3 +46,4 @@ def main(url, addons_dir):
         if new_manifest_str != manifest_str:
             with open(manifest_path, "w") as manifest_file:
                 manifest_file.write(new_manifest_str)
+            clear_manifest_cache(os.path.join(addons_dir, addon_dir))
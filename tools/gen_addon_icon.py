@@ -7,8 +7,9 @@ import shutil
 
 import click
 
+from .addon_index import find_indexed_addons
 from .gitutils import commit_if_needed
-from .manifest import NoManifestFound, find_addons, read_manifest
+from .manifest import NoManifestFound, read_manifest
 
 ICONS_DIR = os.path.join("static", "description")
 
@@ -64,7 +65,7 @@ def gen_addon_icon(addon_dirs, addons_dir, src_icon, commit):
     """
     addons = []
     if addons_dir:
-        addons.extend(find_addons(addons_dir))
+        addons.extend(find_indexed_addons(addons_dir))
     for addon_dir in addon_dirs:
         addon_name = os.path.basename(os.path.abspath(addon_dir))
         try:
@@ -2,22 +2,25 @@
 # Copyright (c) 2018 ACSONE SA/NV
 # Copyright (c) 2018 GRAP (http://www.grap.coop)
 
-import atexit
+import concurrent.futures
 import functools
+import io
+import itertools
+import json
 import os
 import re
+import subprocess
 import sys
-import tempfile
+import time
 from pathlib import Path
-from typing import Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
 from urllib.parse import urljoin
 
 import click
-import pypandoc
-from docutils.core import publish_file
-from jinja2 import Template
 
-from ._hash import hash
+from . import _profile
+from ._cache import RACY_DELAY_NS, FileCache, get_cache_dir, make_key
+from ._hash import hash_many, stat_signature
 from .gitutils import commit_if_needed
 from .manifest import NoManifestFound, find_addons, get_manifest_path, read_manifest
 
@@ -26,6 +29,13 @@ if sys.version_info >= (3, 8):
 else:
     from typing_extensions import Literal
 
+if TYPE_CHECKING:
+    from jinja2 import Template
+
+# pypandoc, docutils and jinja2 are imported when first needed, as they
+# take a large part of the startup time, and pre-commit runs this tool
+# on each commit, often without anything to generate.
+
 
 class FragmentProperties:
     def __init__(self, level: int):
@@ -128,9 +138,22 @@ RST2HTML_SETTINGS = {
 #   target "..;" is not referenced.)
 PANDOC_MARKDOWN_FORMAT = "gfm-raw_html-gfm_auto_identifiers"
 
+# pandoc custom reader used by pandoc_convert_batch()
+PANDOC_BATCH_READER = os.path.join(
+    os.path.dirname(__file__), "gen_addon_readme_pandoc_batch.lua"
+)
+
+# markdown fragments converted to rst are cached, up to this size in bytes
+RST_FRAGMENTS_CACHE_MAX_SIZE = 64 * 1024 * 1024
+
+# size of the cache of addons source digests, see SourceDigestIndex
+SOURCE_DIGESTS_CACHE_MAX_SIZE = 16 * 1024 * 1024
+
 
 @functools.lru_cache(maxsize=None)
 def ensure_pandoc_installed() -> None:
+    import pypandoc
+
     pypandoc.ensure_pandoc_installed(delete_installer=True)
 
 
@@ -258,32 +281,160 @@ def safe_remove(filename: str) -> None:
         pass
 
 
-def prepare_rst_fragment(addon_dir: str, fragment_name: str) -> Union[str, None]:
-    fragment_rst_filename = make_fragment_filename(addon_dir, fragment_name, ".rst")
-    fragment_md_filename = make_fragment_filename(addon_dir, fragment_name, ".md")
-    if os.path.exists(fragment_rst_filename):
-        if os.path.exists(fragment_md_filename):
-            raise SystemExit(
-                f"Both .md and .rst fragment found. Please remove one of "
-                f"{fragment_rst_filename} or {fragment_md_filename}."
-            )
-        return fragment_rst_filename
-    if not os.path.exists(fragment_md_filename):
-        # no .rst nor .md fragment found
-        return None
-    # convert .md to .rst
-    fragment_properties = FRAGMENTS[fragment_name]
+def pandoc_convert_batch(
+    fragments: Sequence[Tuple[str, str, str, int]],
+) -> List[str]:
+    """Convert many fragments with a single pandoc process.
+
+    Fragments are (text, from_format, to_format, shift_heading_level) tuples.
+    The result is the same as converting each fragment with
+    ``pandoc --shift-heading-level-by=<shift_heading_level>``.
+    """
+    import pypandoc
+
     ensure_pandoc_installed()
-    atexit.register(safe_remove, fragment_rst_filename)
-    pypandoc.convert_file(
-        fragment_md_filename,
-        format=PANDOC_MARKDOWN_FORMAT,
-        to="rst",
-        outputfile=fragment_rst_filename,
-        extra_args=[f"--shift-heading-level-by={fragment_properties.level-2}"],
-        sandbox=True,
+    _profile.count("pandoc_invocations")
+    batch = []
+    for text, from_format, to_format, shift_heading_level in fragments:
+        batch.append(f"{from_format} {to_format} {shift_heading_level}\n")
+        # pandoc expands tabs of its input files, but not the text
+        # the batch reader passes to pandoc.read()
+        batch.append(text.expandtabs(4).encode("utf-8").hex() + "\n")
+    output = subprocess.run(
+        [
+            pypandoc.get_pandoc_path(),
+            "--sandbox",
+            "--from",
+            PANDOC_BATCH_READER,
+            "--to",
+            "json",
+        ],
+        input="".join(batch).encode("ascii"),
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
+    results = []
+    for block in json.loads(output)["blocks"]:
+        text = block["c"][1]
+        # the pandoc command line always terminates its output with a newline
+        if not text.endswith("\n"):
+            text += "\n"
+        results.append(text)
+    if len(results) != len(fragments):
+        raise RuntimeError(
+            f"pandoc converted {len(results)} fragments out of {len(fragments)}"
+        )
+    return results
+
+
+def pandoc_convert_many(
+    fragments: Sequence[Tuple[str, str, str, int]],
+) -> List[str]:
+    """Convert fragments with pandoc_convert_batch() if possible.
+
+    Fall back to one pandoc process per fragment with pandoc versions
+    that do not support the batch reader.
+    """
+    if not fragments:
+        return []
+    if len(fragments) > 1:
+        try:
+            return pandoc_convert_batch(fragments)
+        except subprocess.CalledProcessError:
+            pass
+    import pypandoc
+
+    ensure_pandoc_installed()
+    _profile.count("pandoc_invocations", len(fragments))
+    return [
+        pypandoc.convert_text(
+            text,
+            format=from_format,
+            to=to_format,
+            extra_args=[f"--shift-heading-level-by={shift_heading_level}"],
+            sandbox=True,
+        )
+        for text, from_format, to_format, shift_heading_level in fragments
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def _get_rst_fragments_cache(cache_dir: str) -> FileCache:
+    return FileCache(cache_dir, RST_FRAGMENTS_CACHE_MAX_SIZE)
+
+
+def markdown_to_rst_many(mds: Sequence[Tuple[bytes, int]]) -> List[str]:
+    """Convert (markdown, shift_heading_level) fragments to rst.
+
+    Conversions are kept in a persistent cache, and the fragments which are
+    not in the cache are converted together by a single pandoc process.
+    """
+    import pypandoc
+
+    if not mds:
+        return []
+    ensure_pandoc_installed()
+    pandoc_version = pypandoc.get_pandoc_version()
+    keys = [
+        make_key(md, str(shift_heading_level), PANDOC_MARKDOWN_FORMAT, pandoc_version)
+        for md, shift_heading_level in mds
+    ]
+    try:
+        cache = _get_rst_fragments_cache(get_cache_dir("rst-fragments"))
+        rsts = [cache.get(key) for key in keys]
+    except OSError:
+        # the cache is only a speed-up, convert all fragments without it
+        cache = None
+        rsts = [None] * len(keys)
+    missing = [i for i, rst in enumerate(rsts) if rst is None]
+    converted = pandoc_convert_many(
+        [
+            (mds[i][0].decode("utf-8"), PANDOC_MARKDOWN_FORMAT, "rst", mds[i][1])
+            for i in missing
+        ]
     )
-    return fragment_rst_filename
+    for i, rst in zip(missing, converted):
+        rsts[i] = rst.encode("utf-8")
+        if cache is not None:
+            try:
+                cache.set(keys[i], rsts[i])
+            except OSError:
+                cache = None
+    return [rst.decode("utf-8") for rst in rsts]
+
+
+def markdown_to_rst(md: bytes, shift_heading_level: int) -> str:
+    """Convert a markdown fragment to rst, with a persistent cache."""
+    return markdown_to_rst_many([(md, shift_heading_level)])[0]
+
+
+def prepare_rst_fragments(addon_dir: str) -> Dict[str, str]:
+    """Return the content of the fragments of an addon, converted to rst.
+
+    All markdown fragments of the addon are converted at once.
+    """
+    fragments = {}
+    md_fragments = {}
+    for fragment_name in FRAGMENTS:
+        fragment_format = get_fragment_format(addon_dir, fragment_name)
+        if fragment_format is None:
+            continue
+        filename = make_fragment_filename(addon_dir, fragment_name, fragment_format)
+        if fragment_format == ".rst":
+            with open(filename, "r", encoding="utf8") as f:
+                fragments[fragment_name] = f.read()
+        else:
+            with open(filename, "rb") as f:
+                md_fragments[fragment_name] = f.read()
+    rsts = markdown_to_rst_many(
+        [
+            (md, FRAGMENTS[fragment_name].level - 2)
+            for fragment_name, md in md_fragments.items()
+        ]
+    )
+    fragments.update(zip(md_fragments, rsts))
+    # keep the order of FRAGMENTS
+    return {name: fragments[name] for name in FRAGMENTS if name in fragments}
 
 
 def fragment_exists(addon_dir: str, fragment_name: str) -> bool:
@@ -304,6 +455,7 @@ def fragment_exists(addon_dir: str, fragment_name: str) -> bool:
 
 def convert_fragments_to_md(addon_dir: str) -> None:
     """Convert all fragments from .rst to .md format."""
+    fragment_filenames = []
     for fragment_name in FRAGMENTS:
         fragment_rst_filename = make_fragment_filename(
             addon_dir,
@@ -319,18 +471,50 @@ def convert_fragments_to_md(addon_dir: str) -> None:
         )
         if os.path.exists(fragment_md_filename):
             continue
-        ensure_pandoc_installed()
-        pypandoc.convert_file(
-            fragment_rst_filename,
-            format="rst",
-            to=PANDOC_MARKDOWN_FORMAT,
-            outputfile=fragment_md_filename,
-            extra_args=["--shift-heading-level=1"],
-            sandbox=True,
-        )
+        fragment_filenames.append((fragment_rst_filename, fragment_md_filename))
+    rsts = []
+    for fragment_rst_filename, _ in fragment_filenames:
+        with open(fragment_rst_filename, "r", encoding="utf8") as f:
+            rsts.append((f.read(), "rst", PANDOC_MARKDOWN_FORMAT, 1))
+    mds = pandoc_convert_many(rsts)
+    for (fragment_rst_filename, fragment_md_filename), md in zip(
+        fragment_filenames, mds
+    ):
+        with open(fragment_md_filename, "w", encoding="utf8") as f:
+            f.write(md)
         os.remove(fragment_rst_filename)
 
 
+def get_template(template_filename: str) -> "Template":
+    """Return the compiled template, loading it only once per process."""
+    try:
+        cache_dir = get_cache_dir("jinja-bytecode")
+    except OSError:
+        cache_dir = None
+    return _get_template(os.path.abspath(template_filename), cache_dir)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_template(template_filename: str, cache_dir: Optional[str]) -> "Template":
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    loader = FileSystemLoader(os.path.dirname(template_filename))
+    if cache_dir:
+        env = Environment(
+            loader=loader,
+            # the cache is keyed by template file name, and it is invalidated
+            # when the template source changes
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+        )
+        try:
+            return env.get_template(os.path.basename(template_filename))
+        except OSError:
+            # the bytecode cache is only a speed-up
+            pass
+    env = Environment(loader=loader)
+    return env.get_template(os.path.basename(template_filename))
+
+
 def gen_one_addon_readme(
     org_name,
     repo_name,
@@ -344,13 +528,13 @@ def gen_one_addon_readme(
 ):
     fragments_format = get_fragments_format(addon_dir)
     fragments = {}
-    for fragment_name in FRAGMENTS:
-        fragment_filename = prepare_rst_fragment(addon_dir, fragment_name)
-        if fragment_filename:
-            with open(fragment_filename, "r", encoding="utf8") as f:
-                fragment = generate_fragment(org_name, repo_name, branch, addon_name, f)
-                if fragment:
-                    fragments[fragment_name] = fragment
+    with _profile.phase("fragments", addon_name):
+        for fragment_name, fragment_rst in prepare_rst_fragments(addon_dir).items():
+            fragment = generate_fragment(
+                org_name, repo_name, branch, addon_name, io.StringIO(fragment_rst)
+            )
+            if fragment:
+                fragments[fragment_name] = fragment
     badges = []
     development_status = manifest.get("development_status", "Beta").lower()
     if development_status in DEVELOPMENT_STATUS_BADGES:
@@ -373,65 +557,180 @@ def gen_one_addon_readme(
         # maintainers section
     ]
     # generate
-    with open(template_filename, "r", encoding="utf8") as tf:
-        template = Template(tf.read())
-    with open(readme_filename, "w", encoding="utf8") as rf:
-        rf.write(
-            template.render(
-                addon_name=addon_name,
-                authors=authors,
-                badges=badges,
-                branch=branch,
-                fragments=fragments,
-                manifest=manifest,
-                org_name=org_name,
-                repo_name=repo_name,
-                development_status=development_status,
-                source_digest=source_digest,
-                level3_underline="~" if fragments_format == ".rst" else "-",
-            )
+    with _profile.phase("template", addon_name):
+        template = get_template(template_filename)
+        readme = template.render(
+            addon_name=addon_name,
+            authors=authors,
+            badges=badges,
+            branch=branch,
+            fragments=fragments,
+            manifest=manifest,
+            org_name=org_name,
+            repo_name=repo_name,
+            development_status=development_status,
+            source_digest=source_digest,
+            level3_underline="~" if fragments_format == ".rst" else "-",
         )
+    with _profile.phase("write", addon_name):
+        _write_if_changed(readme_filename, readme.encode("utf8"))
+    return readme
 
 
-def check_rst(readme_filename):
-    with tempfile.NamedTemporaryFile() as f:
-        publish_file(
-            source_path=readme_filename,
-            destination=f,
-            writer_name="html4css1",
-            settings_overrides=RST2HTML_SETTINGS,
-        )
+def _write_if_changed(filename, content):
+    """Write content (bytes) to filename, unless it has this content already.
+
+    Return True if the file was written.
+    """
+    try:
+        with open(filename, "rb") as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(filename, "wb") as f:
+        f.write(content)
+    _profile.count("files_written")
+    return True
 
 
-def gen_one_addon_index(readme_filename):
-    addon_dir = os.path.dirname(readme_filename)
-    index_dir = os.path.join(addon_dir, "static", "description")
-    index_filename = os.path.join(index_dir, "index.html")
-    if os.path.exists(index_filename):
-        with open(index_filename, "rb") as f:
-            if b"oca-gen-addon-readme" not in f.read():
-                # index was created manually
-                return
-    if not os.path.isdir(index_dir):
-        os.makedirs(index_dir)
-    publish_file(
-        source_path=readme_filename,
-        destination_path=index_filename,
+def rst_to_html(rst, source_path=None):
+    """Render rst to html.
+
+    This also validates the rst, as docutils raises an error on warnings
+    (see ``halt_level`` in ``RST2HTML_SETTINGS``), so the document is parsed
+    only once for checking and for generating index.html.
+    """
+    from docutils.core import publish_string
+
+    _profile.count("docutils_parses")
+    html = publish_string(
+        source=rst,
+        source_path=source_path,
         writer_name="html4css1",
         settings_overrides=RST2HTML_SETTINGS,
     )
-    with open(index_filename, "rb") as f:
-        index = f.read()
     # remove the docutils version from generated html, to avoid
     # useless changes in the readme
-    index = re.sub(
-        rb"(<meta.*generator.*Docutils)\s*[\d.]+", rb"\1", index, re.MULTILINE
-    )
-    with open(index_filename, "wb") as f:
-        f.write(index)
+    return re.sub(rb"(<meta.*generator.*Docutils)\s*[\d.]+", rb"\1", html, re.MULTILINE)
+
+
+def gen_one_addon_index(readme_filename, html=None):
+    addon_dir = os.path.dirname(readme_filename)
+    index_dir = os.path.join(addon_dir, "static", "description")
+    index_filename = os.path.join(index_dir, "index.html")
+    previous_html = None
+    if os.path.exists(index_filename):
+        with open(index_filename, "rb") as f:
+            previous_html = f.read()
+        if b"oca-gen-addon-readme" not in previous_html:
+            # index was created manually
+            return
+    if html is None:
+        with open(readme_filename, "r", encoding="utf8") as f:
+            html = rst_to_html(f.read(), readme_filename)
+    if html != previous_html:
+        if not os.path.isdir(index_dir):
+            os.makedirs(index_dir)
+        with open(index_filename, "wb") as f:
+            f.write(html)
+        _profile.count("files_written")
     return index_filename
 
 
+def _stat_readme(readme_filename):
+    try:
+        st = os.stat(readme_filename)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+@functools.lru_cache(maxsize=None)
+def _get_source_digests_cache(cache_dir: str) -> FileCache:
+    return FileCache(cache_dir, SOURCE_DIGESTS_CACHE_MAX_SIZE)
+
+
+class SourceDigestIndex:
+    """Stat based index of the source digest of an addon.
+
+    It records the stat data of the source files of the addon with their
+    digest, and the stat data of README.rst when it is known to contain that
+    digest. This lets unchanged addons be detected without reading any file.
+    """
+
+    def __init__(self, addon_dir):
+        self.addon_dir = addon_dir
+        self.sources = (
+            get_manifest_path(addon_dir),
+            os.path.join(addon_dir, FRAGMENTS_DIR),
+        )
+        self.signature = stat_signature(*self.sources, relative_to=addon_dir)
+        self.key = make_key(os.path.abspath(addon_dir))
+        try:
+            self.cache = _get_source_digests_cache(get_cache_dir("source-digests"))
+            data = self.cache.get(self.key)
+        except OSError:
+            # the index is only a speed-up, sources are hashed without it
+            self.cache = data = None
+        self.entry = json.loads(data) if data else {}
+
+    def get_digest(self):
+        """Return the recorded digest if the source files have not changed."""
+        if self.entry.get("sources") != self.signature:
+            return None
+        return self.entry["digest"]
+
+    def readme_match(self, source_digest, readme_stat):
+        """Check if README.rst is known to contain source_digest."""
+        return (
+            readme_stat is not None
+            and self.entry.get("digest") == source_digest
+            and self.entry.get("readme") == readme_stat
+        )
+
+    def save(self, source_digest, readme_stat):
+        # Files modified just before being looked at may be modified again
+        # without changing their mtime, so their stat data can't be trusted.
+        racy_limit = time.time_ns() - RACY_DELAY_NS
+        if any(mtime_ns >= racy_limit for _, _, mtime_ns, _ in self.signature):
+            return
+        if readme_stat is not None and readme_stat[1] >= racy_limit:
+            readme_stat = None
+        entry = {
+            "sources": self.signature,
+            "digest": source_digest,
+            "readme": readme_stat,
+        }
+        if entry != self.entry and self.cache is not None:
+            try:
+                self.cache.set(self.key, json.dumps(entry).encode("utf-8"))
+            except OSError:
+                return
+            self.entry = entry
+
+
+def get_source_digests(digest_indexes, max_workers=None):
+    """Return the source digests of addons, as a {addon_dir: digest} dict.
+
+    Digests are taken from the stat based indexes when possible, the
+    others are computed concurrently.
+    """
+    source_digests = {}
+    to_hash = {}
+    for digest_index in digest_indexes:
+        source_digest = digest_index.get_digest()
+        if source_digest is None:
+            to_hash[digest_index.addon_dir] = (
+                digest_index.sources,
+                digest_index.addon_dir,
+            )
+        else:
+            source_digests[digest_index.addon_dir] = source_digest
+    source_digests.update(hash_many(to_hash, max_workers=max_workers))
+    return source_digests
+
+
 def _source_digest_match(readme_filename, source_digest):
     if not os.path.isfile(readme_filename):
         return False
@@ -458,6 +757,65 @@ def _get_source_digest(readme_filename: str) -> Union[str, None]:
     return mo.group("digest")
 
 
+def _gen_one_addon(
+    org_name,
+    repo_name,
+    branch,
+    addon,
+    source_digest,
+    template_filename,
+    gen_html,
+):
+    """Generate README.rst and index.html for one addon.
+
+    Return the list of generated files.
+    """
+    addon_name, addon_dir, manifest = addon
+    readme_filename = os.path.join(addon_dir, "README.rst")
+    readme = gen_one_addon_readme(
+        org_name,
+        repo_name,
+        branch,
+        addon_name,
+        addon_dir,
+        manifest,
+        template_filename,
+        readme_filename,
+        source_digest,
+    )
+    with _profile.phase("rst_to_html", addon_name):
+        html = rst_to_html(readme, readme_filename)
+    filenames = [readme_filename]
+    if gen_html and manifest.get("preloadable", True):
+        with _profile.phase("index", addon_name):
+            index_filename = gen_one_addon_index(readme_filename, html)
+        if index_filename:
+            filenames.append(index_filename)
+    return filenames
+
+
+def _run_in_worker(func, *args):
+    """Run func in a worker process.
+
+    Return its result with the profiling data it recorded.
+    """
+    # drop data inherited from the parent process
+    _profile.take()
+    try:
+        result = func(*args)
+    except Exception as e:
+        # Some exceptions (such as docutils' SystemMessage) can not be
+        # unpickled in the parent process, so send them back as plain errors.
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+    return result, _profile.take()
+
+
+def _merge_worker_results(results):
+    for result, profile_data in results:
+        _profile.merge(profile_data)
+        yield result
+
+
 @click.command()
 @click.option("--org-name", default="OCA", help="Organization name, eg. OCA.")
 @click.option("--repo-name", required=True, help="Repository name, eg. server-tools.")
@@ -515,6 +873,28 @@ def _get_source_digest(readme_filename: str) -> Union[str, None]:
     is_flag=True,
     default=False,
 )
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="Number of addons to process in parallel. 0 means one per CPU.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    envvar=_profile.PROFILE_ENV,
+    help=(
+        "Print timings of each phase per addon and counters on stderr, "
+        f"as a table and as JSON. Also enabled by {_profile.PROFILE_ENV}=1."
+    ),
+)
+@click.option(
+    "--profile-json",
+    type=click.Path(dir_okay=False),
+    help="Enable --profile, writing its JSON data to this file instead of stderr.",
+)
 def gen_addon_readme(
     org_name,
     repo_name,
@@ -527,6 +907,9 @@ def gen_addon_readme(
     if_fragments_changed,
     convert_fragments_to_markdown,
     keep_source_digest,
+    jobs,
+    profile,
+    profile_json,
 ):
     """Generate README.rst from fragments.
 
@@ -534,9 +917,47 @@ def gen_addon_readme(
     existing README.rst with content generated from the template,
     fragments (DESCRIPTION(.rst|.md), USAGE(.rst|.md), etc) and the addon manifest.
     """
+    if profile or profile_json:
+        _profile.enable()
+    try:
+        _gen_addon_readme(
+            org_name,
+            repo_name,
+            branch,
+            addon_dirs,
+            addons_dir,
+            commit,
+            gen_html,
+            template_filename,
+            if_fragments_changed,
+            convert_fragments_to_markdown,
+            keep_source_digest,
+            jobs,
+        )
+    finally:
+        _profile.report(profile_json)
+
+
+def _gen_addon_readme(
+    org_name,
+    repo_name,
+    branch,
+    addon_dirs,
+    addons_dir,
+    commit,
+    gen_html,
+    template_filename,
+    if_fragments_changed,
+    convert_fragments_to_markdown,
+    keep_source_digest,
+    jobs,
+):
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
     addons = []
     if addons_dir:
-        addons.extend(find_addons(addons_dir))
+        with _profile.phase("find_addons"):
+            addons.extend(find_addons(addons_dir, jobs=jobs))
     for addon_dir in addon_dirs:
         addon_name = os.path.basename(os.path.abspath(addon_dir))
         try:
@@ -544,42 +965,71 @@ def gen_addon_readme(
         except NoManifestFound:
             continue
         addons.append((addon_name, addon_dir, manifest))
-    readme_filenames = []
-    for addon_name, addon_dir, manifest in addons:
-        if convert_fragments_to_markdown:
+    if convert_fragments_to_markdown:
+        for _, addon_dir, _ in addons:
             convert_fragments_to_md(addon_dir)
-        if not fragment_exists(addon_dir, "DESCRIPTION"):
-            continue
+    addons = [addon for addon in addons if fragment_exists(addon[1], "DESCRIPTION")]
+    with _profile.phase("hash"):
+        digest_indexes = [SourceDigestIndex(addon_dir) for _, addon_dir, _ in addons]
+        # hashing runs on threads, sized independently of the --jobs
+        # processes, so it uses all cores in the default sequential mode
+        source_digests = get_source_digests(digest_indexes)
+    # addons to generate, with the source digest to put in their README
+    todo = []
+    for addon, digest_index in zip(addons, digest_indexes):
+        addon_dir = addon[1]
         readme_filename = os.path.join(addon_dir, "README.rst")
-        source_digest = hash(
-            get_manifest_path(addon_dir),
-            os.path.join(addon_dir, FRAGMENTS_DIR),
-            relative_to=addon_dir,
-        )
+        source_digest = source_digests[addon_dir]
         if if_fragments_changed:
+            readme_stat = _stat_readme(readme_filename)
+            if digest_index.readme_match(source_digest, readme_stat):
+                continue
             if _source_digest_match(readme_filename, source_digest):
+                digest_index.save(source_digest, readme_stat)
                 continue
         if keep_source_digest:
             source_digest = _get_source_digest(readme_filename) or source_digest
-        gen_one_addon_readme(
-            org_name,
-            repo_name,
-            branch,
-            addon_name,
-            addon_dir,
-            manifest,
-            template_filename,
-            readme_filename,
-            source_digest,
-        )
-        check_rst(readme_filename)
-        readme_filenames.append(readme_filename)
-        if gen_html:
-            if not manifest.get("preloadable", True):
-                continue
-            index_filename = gen_one_addon_index(readme_filename)
-            if index_filename:
-                readme_filenames.append(index_filename)
+        todo.append((addon, source_digest, digest_index))
+    gen_one_addon = functools.partial(
+        _gen_one_addon,
+        org_name,
+        repo_name,
+        branch,
+        template_filename=template_filename,
+        gen_html=gen_html,
+    )
+    todo_args = [(addon, source_digest) for addon, source_digest, _ in todo]
+    futures = []
+    if jobs > 1 and len(todo) > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+        futures = [
+            executor.submit(_run_in_worker, gen_one_addon, *args) for args in todo_args
+        ]
+        # results are taken in submission order, so the list of
+        # generated files is the same as in sequential mode
+        results = _merge_worker_results(future.result() for future in futures)
+    else:
+        executor = None
+        results = itertools.starmap(gen_one_addon, todo_args)
+    readme_filenames = []
+    try:
+        for (addon, source_digest, digest_index), addon_filenames in zip(todo, results):
+            readme_filenames.extend(addon_filenames)
+            addon_dir = addon[1]
+            readme_stat = None
+            if source_digest == source_digests[addon_dir]:
+                readme_stat = _stat_readme(os.path.join(addon_dir, "README.rst"))
+            digest_index.save(source_digests[addon_dir], readme_stat)
+    except BaseException:
+        # stop at the first error like in sequential mode: the addons not
+        # started yet are not generated (Python < 3.9 has no
+        # shutdown(cancel_futures=True))
+        for future in futures:
+            future.cancel()
+        raise
+    finally:
+        if executor:
+            executor.shutdown()
     if commit:
         commit_if_needed(readme_filenames, "[UPD] README.rst")
 
@@ -0,0 +1,40 @@
+-- Custom pandoc reader converting a batch of fragments in one pandoc process.
+--
+-- Each fragment of the input is made of a header line
+-- "<from format> <to format> <shift heading level>" followed by a line with
+-- the hex encoded fragment text. The resulting document has one code block
+-- per fragment, containing the converted text.
+
+local function shift_headings(doc, shift)
+  if shift == 0 then
+    return doc
+  end
+  return doc:walk({
+    Header = function(header)
+      local level = header.level + shift
+      if level < 1 then
+        -- same as pandoc --shift-heading-level-by
+        return pandoc.Para(header.content)
+      end
+      header.level = level
+      return header
+    end,
+  })
+end
+
+local function unhex(hex)
+  return (hex:gsub("%x%x", function(h)
+    return string.char(tonumber(h, 16))
+  end))
+end
+
+function Reader(input)
+  local blocks = {}
+  for header, hex in tostring(input):gmatch("([^\n]+)\n(%x*)\n") do
+    local from, to, shift = header:match("^(%S+) (%S+) (%-?%d+)$")
+    local doc = pandoc.read(unhex(hex), from)
+    doc = shift_headings(doc, tonumber(shift))
+    table.insert(blocks, pandoc.CodeBlock(pandoc.write(doc, to)))
+  end
+  return pandoc.Pandoc(blocks)
+end
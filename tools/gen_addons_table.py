@@ -15,24 +15,35 @@ Markers in README.md must have the form:
 does not matter, will be replaced by the script
 [//]: # (end addons)
 <!-- prettier-ignore-end -->
+
+A digest of the addons is stored after the first marker, so README.md
+is left untouched when the addons did not change.
 """
 
 from __future__ import print_function
 
-import ast
+import hashlib
 import io
+import json
 import logging
 import os
 import re
 
 import click
 
+from ._markers import replace_marked_regions
+from .addon_index import get_addon_index
 from .gitutils import commit_if_needed
 
 _logger = logging.getLogger(__name__)
 
-MARKERS = r"(\[//\]: # \(addons\))|(\[//\]: # \(end addons\))"
-MANIFESTS = ("__openerp__.py", "__manifest__.py")
+START_MARKER_RE = re.compile(r"\[//\]: # \(addons\)")
+END_MARKER_RE = re.compile(r"\[//\]: # \(end addons\)")
+DIGEST_RE = re.compile(r"^\[//\]: # \(addons digest (\S+)\)$")
+# manifest keys used to render the table
+TABLE_KEYS = ("name", "version", "maintainers", "summary", "installable")
+# bump when the rendering of the table changes
+TABLE_VERSION = 1
 
 
 def sanitize_cell(s):
@@ -62,14 +73,36 @@ def render_maintainers(manifest):
     )
 
 
-def replace_in_readme(readme_path, header, rows_available, rows_unported):
+def compute_table_digest(addons):
+    """Compute a digest of what the addons table is made of.
+
+    addons is a list of (addon_path, unported, manifest).
+    """
+    data = [
+        [addon_path, unported, {key: manifest.get(key) for key in TABLE_KEYS}]
+        for addon_path, unported, manifest in addons
+    ]
+    m = hashlib.sha256()
+    m.update(json.dumps([TABLE_VERSION, data], sort_keys=True).encode("utf-8"))
+    return m.name + ":" + m.hexdigest()
+
+
+def get_table_digest(readme_path):
+    """Return the digest of the addons table in README.md, or None."""
     with io.open(readme_path, encoding="utf8") as f:
-        readme = f.read()
-    parts = re.split(MARKERS, readme, flags=re.MULTILINE)
-    if len(parts) != 7:
-        _logger.warning("Addons markers not found or incorrect in %s", readme_path)
-        return
+        for line in f:
+            mo = DIGEST_RE.match(line)
+            if mo:
+                return mo.group(1)
+            if END_MARKER_RE.search(line):
+                break
+    return None
+
+
+def replace_in_readme(readme_path, header, rows_available, rows_unported, digest=None):
     addons = []
+    if digest:
+        addons.extend(["\n", "[//]: # (addons digest %s)" % digest])
     # TODO Use the same heading styles as Prettier (prefixing the line with
     # `##` instead of adding all `----------` under it)
     if rows_available:
@@ -95,10 +128,52 @@ def replace_in_readme(readme_path, header, rows_available, rows_unported):
             ]
         )
     addons.append("\n")
-    parts[2:5] = addons
-    readme = "".join(parts)
-    with io.open(readme_path, "w", encoding="utf8") as f:
-        f.write(readme)
+    # the first newline ends the start marker line
+    region = "".join(addons)[1:]
+    found = replace_marked_regions(
+        readme_path,
+        START_MARKER_RE.search,
+        END_MARKER_RE.search,
+        lambda start_line: region,
+        encoding="utf8",
+    )
+    if found is None:
+        _logger.warning("Addons markers not found or incorrect in %s", readme_path)
+
+
+HEADER = ("addon", "version", "maintainers", "summary")
+
+
+def render_rows(addons):
+    """Render the rows of the available and unported addons tables."""
+    rows_available = []
+    rows_unported = []
+    for addon_path, unported, manifest in addons:
+        addon_name = os.path.basename(addon_path)
+        link = "[%s](%s/)" % (addon_name, addon_path)
+        version = manifest.get("version") or ""
+        summary = manifest.get("summary") or manifest.get("name")
+        summary = sanitize_cell(summary)
+        installable = manifest.get("installable", True)
+        if unported and installable:
+            _logger.warning(
+                "%s is in __unported__ but is marked " "installable." % addon_path
+            )
+            installable = False
+        if installable:
+            rows_available.append(
+                (link, version, render_maintainers(manifest), summary)
+            )
+        else:
+            rows_unported.append(
+                (
+                    link,
+                    version + " (unported)",
+                    render_maintainers(manifest),
+                    summary,
+                )
+            )
+    return rows_available, rows_unported
 
 
 @click.command(help=__doc__)
@@ -120,56 +195,23 @@ def gen_addons_table(commit, readme_path, addons_dir):
         _logger.warning("%s not found", readme_path)
         return
     # list addons in . and __unported__
-    addon_paths = []  # list of (addon_path, unported)
-    for addon_path in os.listdir(addons_dir):
-        addon_paths.append((addon_path, False))
+    addons = []  # list of (addon_path, unported, manifest)
+    for addon_name, entry in get_addon_index(addons_dir).items():
+        addons.append((addon_name, False, entry["manifest"]))
     unported_directory = os.path.join(
         "" if addons_dir == "." else addons_dir, "__unported__"
     )
     if os.path.isdir(unported_directory):
-        for addon_path in os.listdir(unported_directory):
-            addon_path = os.path.join(unported_directory, addon_path)
-            addon_paths.append((addon_path, True))
-    addon_paths = sorted(addon_paths, key=lambda x: x[0])
-    # load manifests
-    header = ("addon", "version", "maintainers", "summary")
-    rows_available = []
-    rows_unported = []
-    for addon_path, unported in addon_paths:
-        for manifest_file in MANIFESTS:
-            manifest_path = os.path.join(addon_path, manifest_file)
-            has_manifest = os.path.isfile(manifest_path)
-            if has_manifest:
-                break
-        if has_manifest:
-            with open(manifest_path) as f:
-                manifest = ast.literal_eval(f.read())
-            addon_name = os.path.basename(addon_path)
-            link = "[%s](%s/)" % (addon_name, addon_path)
-            version = manifest.get("version") or ""
-            summary = manifest.get("summary") or manifest.get("name")
-            summary = sanitize_cell(summary)
-            installable = manifest.get("installable", True)
-            if unported and installable:
-                _logger.warning(
-                    "%s is in __unported__ but is marked " "installable." % addon_path
-                )
-                installable = False
-            if installable:
-                rows_available.append(
-                    (link, version, render_maintainers(manifest), summary)
-                )
-            else:
-                rows_unported.append(
-                    (
-                        link,
-                        version + " (unported)",
-                        render_maintainers(manifest),
-                        summary,
-                    )
-                )
-    # replace table in README.md
-    replace_in_readme(readme_path, header, rows_available, rows_unported)
+        for addon_name, entry in get_addon_index(unported_directory).items():
+            addon_path = os.path.join(unported_directory, addon_name)
+            addons.append((addon_path, True, entry["manifest"]))
+    addons = sorted(addons, key=lambda x: x[0])
+    digest = compute_table_digest(addons)
+    # the table is up to date if its digest is unchanged
+    if get_table_digest(readme_path) != digest:
+        rows_available, rows_unported = render_rows(addons)
+        # replace table in README.md
+        replace_in_readme(readme_path, HEADER, rows_available, rows_unported, digest)
     if commit:
         commit_if_needed(
             [readme_path],
@@ -7,8 +7,6 @@ import os
 import subprocess
 from getpass import getpass
 
-import github3
-
 from .config import read_config, write_config
 
 
@@ -16,7 +14,8 @@ class GitHubLoginError(RuntimeError):
     pass
 
 
-def login():
+def get_token():
+    """Return the GitHub token of the user."""
     if os.environ.get("GITHUB_TOKEN"):
         token = os.environ["GITHUB_TOKEN"]
     else:
@@ -36,13 +35,21 @@ def login():
             "Please run 'oca-github-login' or set the GITHUB_TOKEN "
             "environment variable."
         )
-    return github3.login(token=token)
+    return token
+
+
+def login():
+    import github3
+
+    return github3.login(token=get_token())
 
 
 def store_token():
     config = read_config()
     if config.get("GitHub", "token"):
         print("Note: a token already exists and will be replaced.")
+    import github3
+
     token = getpass("Enter Github Client Token: ")
     auth = github3.login(token=token)
     config.set("GitHub", "token", token)
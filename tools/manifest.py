@@ -2,7 +2,11 @@
 # License AGPLv3 (https://www.gnu.org/licenses/agpl-3.0-standalone.html)
 
 import ast
+import collections
+import concurrent.futures
 import os
+import time
+from typing import Dict, Iterable, Optional, Tuple
 
 MANIFEST_NAMES = ("__manifest__.py", "__openerp__.py", "__terp__.py")
 
@@ -18,26 +22,167 @@ def get_manifest_path(addon_dir):
             return manifest_path
 
 
+# counters of manifest accesses in this process: cache_hits, index_hits (see
+# addon_index), parsed (number of manifest files parsed) and parse_ns (time
+# spent reading and parsing them)
+manifest_counters: "collections.Counter[str]" = collections.Counter()
+
+# process-wide cache of parsed manifests:
+# {(manifest_path, keys): (mtime_ns, size, manifest)}
+_manifest_cache: Dict[Tuple[str, Optional[frozenset]], Tuple[int, int, dict]] = {}
+
+
 def parse_manifest(s):
     return ast.literal_eval(s)
 
 
-def read_manifest(addon_dir):
+def parse_manifest_keys(s, keys):
+    """Parse only the given top-level keys of a manifest.
+
+    The values of the other keys are not evaluated. Keys that are absent
+    from the manifest are absent from the result.
+    """
+    node = ast.parse(s, mode="eval").body
+    if not isinstance(node, ast.Dict):
+        raise ValueError("manifest is not a dictionary")
+    manifest = {}
+    for key_node, value_node in zip(node.keys, node.values):
+        if key_node is None:
+            # **expansion, which literal_eval would reject anyway
+            raise ValueError("malformed manifest")
+        key = ast.literal_eval(key_node)
+        if key in keys:
+            manifest[key] = ast.literal_eval(value_node)
+    return manifest
+
+
+def read_manifest(addon_dir, keys: Optional[Iterable[str]] = None):
+    """Read the manifest of an addon.
+
+    If keys is given, only these top-level keys are read, which is faster
+    for large manifests.
+
+    Manifests are cached for the duration of the process, and parsed again
+    when their modification time or size changes. The returned dictionary is
+    shared, so it must not be modified. Use clear_manifest_cache() after
+    modifying a manifest in a way that may preserve its mtime and size.
+    """
     manifest_path = get_manifest_path(addon_dir)
     if not manifest_path:
         raise NoManifestFound("no Odoo manifest found in %s" % addon_dir)
-    with open(manifest_path) as mf:
-        return parse_manifest(mf.read())
+    return read_manifest_file(manifest_path, keys)
 
 
-def find_addons(addons_dir, installable_only=True):
-    """yield (addon_name, addon_dir, manifest)"""
-    for addon_name in os.listdir(addons_dir):
-        addon_dir = os.path.join(addons_dir, addon_name)
-        try:
-            manifest = read_manifest(addon_dir)
-        except NoManifestFound:
-            continue
+def _load_manifest_file(manifest_path, keys=None):
+    """Read and parse a manifest file, without cache.
+
+    Return (stat, data, manifest) where data is the content of the file,
+    decoded as UTF-8 like Python sources, and manifest is limited to keys if
+    given. This is the only place where manifest files are read.
+    """
+    start = time.perf_counter_ns()
+    st = os.stat(manifest_path)
+    with open(manifest_path, "rb") as mf:
+        data = mf.read()
+    s = data.decode("utf-8")
+    manifest = parse_manifest(s) if keys is None else parse_manifest_keys(s, keys)
+    manifest_counters["parsed"] += 1
+    manifest_counters["parse_ns"] += time.perf_counter_ns() - start
+    return st, data, manifest
+
+
+def _parse_manifest_file(manifest_path, keys=None):
+    """Return (mtime_ns, size, manifest) for a manifest file."""
+    st, _, manifest = _load_manifest_file(manifest_path, keys)
+    return st.st_mtime_ns, st.st_size, manifest
+
+
+def read_manifest_file(manifest_path, keys: Optional[Iterable[str]] = None):
+    """Read a manifest file, using the cache of read_manifest()."""
+    if keys is not None:
+        keys = frozenset(keys)
+    cache_key = (os.path.abspath(manifest_path), keys)
+    cached = _manifest_cache.get(cache_key)
+    if cached:
+        st = os.stat(manifest_path)
+        if cached[:2] == (st.st_mtime_ns, st.st_size):
+            manifest_counters["cache_hits"] += 1
+            return cached[2]
+    cached = _manifest_cache[cache_key] = _parse_manifest_file(manifest_path, keys)
+    return cached[2]
+
+
+def clear_manifest_cache(addon_dir=None):
+    """Forget the cached manifest of an addon, or of all addons."""
+    if addon_dir is None:
+        _manifest_cache.clear()
+        return
+    manifest_path = get_manifest_path(addon_dir)
+    if not manifest_path:
+        return
+    manifest_path = os.path.abspath(manifest_path)
+    for cache_key in [k for k in _manifest_cache if k[0] == manifest_path]:
+        del _manifest_cache[cache_key]
+
+
+def _get_manifest_name(addon_dir):
+    """Return the manifest file name in addon_dir, or None.
+
+    This lists the directory once instead of testing each manifest name.
+    """
+    names = set()
+    try:
+        with os.scandir(addon_dir) as it:
+            for entry in it:
+                if entry.name in MANIFEST_NAMES and entry.is_file():
+                    names.add(entry.name)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    for manifest_name in MANIFEST_NAMES:
+        if manifest_name in names:
+            return manifest_name
+    return None
+
+
+def _find_manifest_paths(addons_dir):
+    """Yield (addon_name, addon_dir, manifest_path) of addons in addons_dir."""
+    with os.scandir(addons_dir) as it:
+        for entry in it:
+            # is_dir() uses the file type returned by the directory
+            # listing, so plain files are skipped without any stat call
+            if not entry.is_dir():
+                continue
+            manifest_name = _get_manifest_name(entry.path)
+            if manifest_name:
+                manifest_path = os.path.join(entry.path, manifest_name)
+                yield entry.name, entry.path, manifest_path
+
+
+def find_addons(addons_dir, installable_only=True, jobs=1):
+    """yield (addon_name, addon_dir, manifest)
+
+    With jobs > 1, the manifests that are not in the cache are parsed by
+    that number of processes.
+    """
+    candidates = list(_find_manifest_paths(addons_dir))
+    if jobs > 1:
+        to_parse = [
+            manifest_path
+            for _, _, manifest_path in candidates
+            if (os.path.abspath(manifest_path), None) not in _manifest_cache
+        ]
+        if len(to_parse) > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = executor.map(
+                    _parse_manifest_file,
+                    to_parse,
+                    chunksize=max(1, len(to_parse) // (jobs * 4)),
+                )
+                manifest_counters["parsed"] += len(to_parse)
+                for manifest_path, result in zip(to_parse, results):
+                    _manifest_cache[(os.path.abspath(manifest_path), None)] = result
+    for addon_name, addon_dir, manifest_path in candidates:
+        manifest = read_manifest_file(manifest_path)
         if installable_only and not manifest.get("installable", True):
             continue
         yield addon_name, addon_dir, manifest
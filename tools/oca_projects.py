@@ -3,60 +3,135 @@
 """
 Data about OCA Projects, with a few helper functions.
 
-OCA_REPOSITORY_NAMES: list of OCA repository names
+OCA_REPOSITORY_NAMES: list of OCA repository names, fetched from GitHub on
+first access (see get_repository_names())
 
 """
 
 from __future__ import print_function
 
+import functools
+import json
 import os
 import shutil
 import subprocess
 import tempfile
+import time
 from contextlib import contextmanager
+from typing import Dict, List
 
-import appdirs
-
+from ._cache import FileCache, get_cache_dir, make_key
+from ._github_api import GitHubAPI
 from .config import NOT_ADDONS, is_main_branch
-from .github_login import login
+from .github_login import get_token, login
 
 ALL = ["OCA_REPOSITORY_NAMES", "url"]
 
 
-def get_repositories():
+def get_repositories(org_name="OCA"):
     gh = login()
     all_repos = [
         repo.name
-        for repo in gh.repositories_by("OCA")
+        for repo in gh.repositories_by(org_name)
         if repo.name not in NOT_ADDONS and not repo.archived
     ]
     return all_repos
 
 
-def get_repositories_and_branches(repos=(), branches=(), branch_filter=is_main_branch):
-    gh = login()
-    for repo in gh.repositories_by("OCA"):
-        if repos and repo.name not in repos:
-            continue
-        if repo.name in NOT_ADDONS:
+# branches of the repositories, by organization, for this process
+_branches_snapshots = {}
+
+
+def get_branches_snapshot(
+    org_name="OCA", jobs=8, graphql=False
+) -> Dict[str, List[str]]:
+    """Return the branch names of the addons repositories of an organization.
+
+    The result is a {repository name: branch names} dictionary. It is fetched
+    once per process: the branches of the repositories are listed by jobs
+    concurrent requests, or with bulk GraphQL queries if graphql is True.
+    """
+    if org_name not in _branches_snapshots:
+        api = GitHubAPI(get_token())
+        if graphql:
+            snapshot = api.get_repositories_and_branches_graphql(org_name)
+        else:
+            snapshot = api.get_repositories_and_branches(org_name, max_workers=jobs)
+        _branches_snapshots[org_name] = {
+            repo_name: branch_names
+            for repo_name, branch_names in snapshot.items()
+            if repo_name not in NOT_ADDONS
+        }
+    return _branches_snapshots[org_name]
+
+
+def get_repositories_and_branches(
+    repos=(), branches=(), branch_filter=is_main_branch, graphql=False
+):
+    for repo_name, branch_names in get_branches_snapshot(graphql=graphql).items():
+        if repos and repo_name not in repos:
             continue
-        for branch in repo.branches():
-            if branches and branch.name not in branches:
+        for branch_name in branch_names:
+            if branches and branch_name not in branches:
                 continue
-            if branch_filter and not branch_filter(branch.name):
+            if branch_filter and not branch_filter(branch_name):
                 continue
-            yield repo.name, branch.name
+            yield repo_name, branch_name
+
+
+# how long the repository catalog is kept, in seconds
+REPOSITORY_CATALOG_TTL = 24 * 3600
+
+REPOSITORY_CATALOG_CACHE_MAX_SIZE = 1024 * 1024
 
+# repository names of the catalog, by organization, for this process
+_repository_names = {}
 
-try:
-    OCA_REPOSITORY_NAMES = get_repositories()
-except Exception as exc:
-    print(exc)
-    OCA_REPOSITORY_NAMES = []
 
-OCA_REPOSITORY_NAMES.sort()
+@functools.lru_cache(maxsize=None)
+def _get_repository_catalog_cache(cache_dir: str) -> FileCache:
+    return FileCache(cache_dir, REPOSITORY_CATALOG_CACHE_MAX_SIZE)
+
+
+def get_repository_names(
+    org_name="OCA", refresh=False, ttl=REPOSITORY_CATALOG_TTL
+) -> List[str]:
+    """Return the sorted names of the addons repositories of an organization.
+
+    They are fetched from GitHub on first call, and kept in the user cache
+    for ttl seconds. With refresh=True, they are fetched again in any case.
+    If GitHub can't be reached, an expired catalog is used if there is one.
+    """
+    if not refresh and org_name in _repository_names:
+        return _repository_names[org_name]
+    cache = _get_repository_catalog_cache(get_cache_dir("repository-catalog"))
+    key = make_key(org_name)
+    data = cache.get(key)
+    catalog = json.loads(data) if data else None
+    if refresh or not catalog or time.time() - catalog["fetched_at"] > ttl:
+        try:
+            names = sorted(get_repositories(org_name))
+        except Exception:
+            if not catalog:
+                raise
+        else:
+            catalog = {"fetched_at": time.time(), "repositories": names}
+            cache.set(key, json.dumps(catalog).encode("utf-8"))
+    _repository_names[org_name] = catalog["repositories"]
+    return catalog["repositories"]
+
+
+def __getattr__(name):
+    # compute OCA_REPOSITORY_NAMES on first access, instead of at import
+    if name in ("OCA_REPOSITORY_NAMES", "_OCA_REPOSITORY_NAMES"):
+        try:
+            names = get_repository_names()
+        except Exception as exc:
+            print(exc)
+            names = []
+        return names if name == "OCA_REPOSITORY_NAMES" else set(names)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-_OCA_REPOSITORY_NAMES = set(OCA_REPOSITORY_NAMES)
 
 _URL_MAPPINGS = {
     "git": "git@github.com:%s/%s.git",
@@ -74,51 +149,149 @@ class BranchNotFoundError(RuntimeError):
     pass
 
 
-@contextmanager
-def temporary_clone(project_name, branch=None, protocol="git", org_name="OCA"):
-    """context manager that clones a git branch and cd to it, with cache"""
-    # init cache directory
-    cache_dir = appdirs.user_cache_dir("oca-mqt")
-    repo_cache_dir = os.path.join(
-        cache_dir, "github.com", org_name.lower(), project_name.lower()
-    )
-    if not os.path.isdir(repo_cache_dir):
-        os.makedirs(repo_cache_dir)
+def get_repo_cache_dir(project_name, org_name="OCA"):
+    """Return the bare repository caching the branches of a project.
+
+    It is created if needed, under the user cache directory.
+    """
+    repo_cache_dir = get_cache_dir("github.com", org_name.lower(), project_name.lower())
+    if not os.path.exists(os.path.join(repo_cache_dir, "HEAD")):
         subprocess.check_call(["git", "init", "--bare"], cwd=repo_cache_dir)
-    repo_url = url(project_name, protocol, org_name)
-    # fetch all branches into cache
-    fetch_cmd = [
-        "git",
-        "fetch",
-        "--quiet",
-        "--force",
-        repo_url,
-        "refs/heads/*:refs/heads/*",
-    ]
-    subprocess.check_call(fetch_cmd, cwd=repo_cache_dir)
+    return repo_cache_dir
+
+
+# how long fetched branches are considered fresh in repository caches, in
+# seconds: clones still fetch the latest commits from the remote, only the
+# branch list and the objects borrowed from the cache may be that old
+REPO_CACHE_FETCH_TTL = 300
+
+# file of the repository cache recording the time of the last fetches
+FETCH_TIMES_FILENAME = "oca-fetch-times.json"
+
+
+def _ls_remote_heads(repo_url, branch=None) -> Dict[str, str]:
+    """Return {branch name: commit} of the remote repository."""
+    cmd = ["git", "ls-remote", "--heads", repo_url]
     if branch:
-        # check if branch exist
-        branches = subprocess.check_output(
-            ["git", "branch"], universal_newlines=True, cwd=repo_cache_dir
-        )
-        branches = [b.strip() for b in branches.split()]
-        if branch not in branches:
+        cmd.append("refs/heads/" + branch)
+    output = subprocess.check_output(cmd, universal_newlines=True)
+    heads = {}
+    for line in output.splitlines():
+        sha, ref = line.split("\t")
+        heads[ref[len("refs/heads/") :]] = sha
+    return heads
+
+
+def _local_heads(repo_dir) -> Dict[str, str]:
+    output = subprocess.check_output(
+        [
+            "git",
+            "for-each-ref",
+            "--format=%(refname:short) %(objectname)",
+            "refs/heads",
+        ],
+        universal_newlines=True,
+        cwd=repo_dir,
+    )
+    return dict(line.split(" ") for line in output.splitlines())
+
+
+def _read_fetch_times(repo_cache_dir) -> Dict[str, float]:
+    try:
+        with open(os.path.join(repo_cache_dir, FETCH_TIMES_FILENAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_fetch_times(repo_cache_dir, fetch_times):
+    path = os.path.join(repo_cache_dir, FETCH_TIMES_FILENAME)
+    fd, tmp_path = tempfile.mkstemp(dir=repo_cache_dir, prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(fetch_times, f)
+    os.replace(tmp_path, path)
+
+
+def update_repo_cache(project_name, protocol="git", org_name="OCA", branch=None, ttl=0):
+    """Fetch the branches of a project into its bare cache, and return it.
+
+    All branches are fetched, or only branch if given. The fetch is skipped
+    if they were fetched less than ttl seconds ago, or if git ls-remote shows
+    that they have not changed since the last fetch.
+    """
+    repo_cache_dir = get_repo_cache_dir(project_name, org_name)
+    fetch_times = _read_fetch_times(repo_cache_dir)
+    # fetching all branches also fetches branch
+    last_fetch = max(fetch_times.get("*", 0), fetch_times.get(branch, 0))
+    now = time.time()
+    if now - last_fetch < ttl:
+        return repo_cache_dir
+    repo_url = url(project_name, protocol, org_name)
+    remote_heads = _ls_remote_heads(repo_url, branch)
+    if not remote_heads.items() <= _local_heads(repo_cache_dir).items():
+        refspec = "refs/heads/*:refs/heads/*"
+        if branch:
+            refspec = "refs/heads/{0}:refs/heads/{0}".format(branch)
+        fetch_cmd = ["git", "fetch", "--quiet", "--force", repo_url, refspec]
+        subprocess.check_call(fetch_cmd, cwd=repo_cache_dir)
+    fetch_times[branch or "*"] = now
+    _write_fetch_times(repo_cache_dir, fetch_times)
+    return repo_cache_dir
+
+
+@contextmanager
+def temporary_clone(
+    project_name,
+    branch=None,
+    protocol="git",
+    org_name="OCA",
+    single_branch=False,
+    depth=None,
+    blob_filter=None,
+    fetch_ttl=REPO_CACHE_FETCH_TTL,
+):
+    """context manager that clones a git branch and cd to it, with cache
+
+    Callers declare what they need to limit transfers: with single_branch,
+    only branch is fetched and cloned; depth makes a shallow clone of that
+    many commits; blob_filter makes a partial clone (e.g. "blob:none", where
+    file contents are fetched on demand). Shallow and partial clones are made
+    directly from the remote, without the cache of complete repositories.
+    The cache is not updated if it was less than fetch_ttl seconds ago.
+    """
+    repo_url = url(project_name, protocol, org_name)
+    clone_cmd = ["git", "clone", "--quiet"]
+    if depth or blob_filter:
+        if branch and not _ls_remote_heads(repo_url, branch):
             raise BranchNotFoundError()
-    # clone to temp dir, with --reference to cache
+        if depth:
+            clone_cmd += ["--depth", str(depth)]
+        if blob_filter:
+            clone_cmd += ["--filter", blob_filter]
+    else:
+        # fetch the branch, or all branches, into cache
+        cache_branch = branch if single_branch else None
+        repo_cache_dir = update_repo_cache(
+            project_name, protocol, org_name, branch=cache_branch, ttl=fetch_ttl
+        )
+        if branch:
+            # check if branch exist
+            if branch not in _local_heads(repo_cache_dir) and fetch_ttl:
+                # it may have been created since the cache was last updated
+                update_repo_cache(project_name, protocol, org_name, cache_branch)
+            if branch not in _local_heads(repo_cache_dir):
+                raise BranchNotFoundError()
+        clone_cmd += ["--reference", repo_cache_dir]
+    if single_branch:
+        clone_cmd += ["--single-branch"]
+    elif depth:
+        # --depth implies --single-branch
+        clone_cmd += ["--no-single-branch"]
+    if branch:
+        clone_cmd += ["--branch", branch]
+    # clone to temp dir
     tempdir = tempfile.mkdtemp()
     try:
-        clone_cmd = [
-            "git",
-            "clone",
-            "--quiet",
-            "--reference",
-            repo_cache_dir,
-        ]
-        if branch:
-            clone_cmd += [
-                "--branch",
-                branch,
-            ]
         clone_cmd += [
             "--",
             repo_url,
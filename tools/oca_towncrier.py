@@ -109,7 +109,9 @@ def oca_towncrier(addon_dirs, version, date, org, repo, commit):
             continue
         if not any(not f.startswith(".") for f in os.listdir(news_dir)):
             continue
-        addon_version = version or read_manifest(addon_dir)["version"]
+        addon_version = (
+            version or read_manifest(addon_dir, keys=("version",))["version"]
+        )
         with _prepare_config(addon_dir, org, repo) as (config_file_name, result_file):
             subprocess.call(
                 [
@@ -7,8 +7,6 @@ import os
 import sys
 from getpass import getpass
 
-import erppeek
-
 from .config import read_config, write_config
 
 ODOO_URL = os.environ.get("ODOO_URL", "https://odoo-community.org")
@@ -37,6 +35,8 @@ def login(username, store):
                 "ODOO_PASSWORD environment variables."
             )
 
+    import erppeek
+
     client = erppeek.Client(ODOO_URL)
     # workaround to connect on saas:
     # https://github.com/tinyerp/erppeek/issues/58
@@ -66,10 +66,6 @@ import logging
 from getpass import getpass
 
 import click
-from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
 
 from .config import read_config
 from .oca_projects import get_repositories_and_branches, url
@@ -126,6 +122,10 @@ def main(
     password = config.get("apps.odoo.com", "password")
     if not password:
         password = getpass(prompt="Odoo.com account password:")
+    # selenium is imported here to keep the startup of the command fast
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
     # Selenium options
     options = Options()
     options.headless = True
@@ -177,6 +177,8 @@ def main(
 
 
 def login(driver, user, password):
+    from selenium.webdriver.support.ui import WebDriverWait
+
     wait = WebDriverWait(driver, 10)
     driver.get(
         "https://www.odoo.com/web/login?redirect=%2Foauth2%2Fauth%2F%3Fscope"
@@ -210,6 +212,9 @@ def register_repository(driver, repository):
 
 
 def scan_repository(driver, org, repository, branch, force_scan, scan_skip_empty):
+    from selenium.common.exceptions import NoSuchElementException
+    from selenium.webdriver.support.ui import WebDriverWait
+
     wait = WebDriverWait(driver, 300)
     for protocol in ("https", "ssh"):
         repository_url = url(repository, protocol=protocol, org_name=org) + "#" + branch